@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watch Party - Micro-benchmarks de performance
+Usage: python benchmark.py [broadcast] [codec] [startup]
+"""
+
+import os
+import sys
+import time
+import subprocess
+from server import Server, Room, ClientConnection
+from protocol import BINARY_CODEC, HEADER_SIZE, encode_message, decode_payload
+
+class NullConnection(ClientConnection):
+    """Connexion factice : les messages restent en file, aucun envoi réseau"""
+
+    def wake_writer(self):
+        pass
+
+    def close_transport(self):
+        pass
+
+def bench_broadcast(recipients=1000, rounds=200):
+    """Compare le coût par destinataire d'une diffusion avant/après la sérialisation unique"""
+    server = Server()
+    server.outbound_queue_size = rounds + 1
+    for port in range(recipients):
+        server.clients.add(NullConnection(("127.0.0.1", port), server))
+    message = {
+        "type": "chat",
+        "username": "Benchmark",
+        "content": "Message de test pour mesurer le coût de la diffusion " * 4
+    }
+
+    def clear_queues():
+        for client in server.clients.snapshot():
+            client.queue.clear()
+
+    # Avant : une sérialisation JSON par destinataire
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for client in server.clients.snapshot():
+            client.send(encode_message(message), message["type"])
+    per_recipient_before = (time.perf_counter() - start) / (rounds * recipients)
+    clear_queues()
+
+    # Après : une seule sérialisation partagée par toutes les files
+    start = time.perf_counter()
+    for _ in range(rounds):
+        server.broadcast(message)
+    per_recipient_after = (time.perf_counter() - start) / (rounds * recipients)
+    clear_queues()
+
+    print(f"Diffusion à {recipients} clients ({rounds} messages)")
+    print(f"  Sérialisation par client : {per_recipient_before * 1e6:.2f} µs/destinataire")
+    print(f"  Sérialisation unique     : {per_recipient_after * 1e6:.2f} µs/destinataire")
+    print(f"  Gain                     : x{per_recipient_before / per_recipient_after:.1f}")
+
+def bench_codec(rounds=100000):
+    """Compare taille et coût (encodage + décodage) des messages fréquents en JSON et en binaire"""
+    # Les états sont ceux que le serveur diffuse réellement (Room.commit_state)
+    room = Room("benchmark")
+    video_state = room.commit_state(0.0, False, rate=1.0, url="https://www.youtube.com/watch?v=jNQXAC9IVRw")
+    play_state = room.commit_state(playing=True)
+    messages = [
+        ("report_position", {"type": "report_position", "time": 1234.567, "playing": True,
+                             "is_host": False, "sent_at": 1760000000.123}),
+        ("state (lecture)", play_state),
+        ("state (nouvelle vidéo, reste en JSON)", video_state),
+        ("pong", {"type": "pong", "t0": 1760000000.1, "t1": 1760000000.15, "t2": 1760000000.16})
+    ]
+    for label, message in messages:
+        print(f"Message {label} ({rounds} encodages + décodages)")
+        for codec_label, codec in (("JSON   ", None), ("Binaire", BINARY_CODEC)):
+            size = len(encode_message(message, codec))
+            start = time.perf_counter()
+            for _ in range(rounds):
+                decode_payload(encode_message(message, codec)[HEADER_SIZE:])
+            per_message = (time.perf_counter() - start) / rounds
+            print(f"  {codec_label} : {size:3d} octets, {per_message * 1e6:.2f} µs/message")
+
+# Dépendances lourdes qui ne doivent être chargées qu'à leur première utilisation
+LAZY_MODULES = ("selenium", "pyngrok", "requests", "PIL")
+
+def import_times(statement):
+    """Exécute statement dans un interpréteur neuf (python -X importtime)
+
+    Renvoie la liste (profondeur, module, durée cumulée en µs) des imports effectués.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement],
+                            capture_output=True, text=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)))
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line.split("|")
+        try:
+            cumulative = int(parts[1])
+        except (IndexError, ValueError):
+            continue  # Ligne d'en-tête
+        name = parts[2].rstrip()
+        entries.append((len(name) - len(name.lstrip()), name.strip(), cumulative))
+    return entries
+
+def bench_startup(rounds=5):
+    """Mesure le temps d'import de l'interface et du serveur dédié
+
+    Renvoie False si une dépendance lourde est de nouveau chargée dès l'import.
+    """
+    ok = True
+    targets = [("gui", LAZY_MODULES), ("server", LAZY_MODULES + ("tkinter",))]
+    for module, lazy in targets:
+        runs = [import_times(f"import {module}") for _ in range(rounds)]
+        best = min(cumulative for entries in runs for _, name, cumulative in entries if name == module)
+        loaded = sorted({name for _, name, _ in runs[0] if name in lazy})
+
+        print(f"Import de {module} (meilleur de {rounds} essais)")
+        print(f"  Temps d'import           : {best / 1000:.1f} ms")
+        if loaded:
+            print(f"  ERREUR, chargés d'emblée : {', '.join(loaded)}")
+            ok = False
+        else:
+            print(f"  Chargés à la demande     : {', '.join(lazy)}")
+
+    # Coût que le démarrage n'a plus à payer (imports de premier niveau uniquement)
+    entries = import_times("import selenium.webdriver, pyngrok.ngrok, requests, PIL.ImageTk")
+    depth = min(depth for depth, _, _ in entries)
+    deferred = sum(cumulative for entry_depth, name, cumulative in entries
+                   if entry_depth == depth and name.split(".")[0] in LAZY_MODULES)
+    print(f"Imports différés (Selenium, ngrok, requests, PIL) : {deferred / 1000:.1f} ms")
+    return ok
+
+BENCHMARKS = {
+    "broadcast": bench_broadcast,
+    "codec": bench_codec,
+    "startup": bench_startup,
+}
+
+def main():
+    """Exécute les benchmarks demandés (tous par défaut)"""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Benchmark inconnu: {name} (disponibles: {', '.join(BENCHMARKS)})")
+            return 1
+        # Un benchmark qui renvoie False signale une régression
+        if BENCHMARKS[name]() is False:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
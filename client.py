@@ -2,36 +2,82 @@
 
 import socket
 import threading
-import json
 import time
 import logging
-from utils_config import PORT, BUFFER_SIZE, logger
+from utils_config import PORT, BUFFER_SIZE, DEFAULT_ROOM, logger
+from protocol import FrameDecoder, ProtocolError, BINARY_CODEC, encode_message, decode_payload
+from clock_sync import ClockEstimator
+from command_queue import CommandQueue
 from youtube_controller import YouTubeController
 
 class Client:
     """Classe représentant un client qui se connecte au serveur de synchronisation"""
     
-    def __init__(self, host='localhost', port=PORT):
+    def __init__(self, host='localhost', port=PORT, youtube_controller=None, room_id=DEFAULT_ROOM):
         self.host = host
         self.port = port
+        self.room_id = room_id  # Salle à rejoindre sur le serveur
         self.client_socket = None
+        self.send_lock = threading.Lock()  # Évite d'entrelacer les trames envoyées par plusieurs threads
         self.connected = False
         self.running = False
-        self.youtube_controller = YouTubeController()
+        # Navigateur éventuellement préchauffé par l'interface (YouTubeController.prewarm)
+        self.youtube_controller = youtube_controller or YouTubeController()
         self.username = "User" + str(int(time.time()) % 1000)  # Nom par défaut
         self.message_handlers = {}
         self.last_sync_time = 0
         self.is_host = False  # Indique si ce client est l'hôte
+        self.client_id = None  # Identifiant de connexion attribué par le serveur
+        # Codec binaire des messages fréquents (position, état, ping), utilisé si le serveur le propose
+        self.binary_codec_enabled = True
+        self.codec = None  # Codec négocié avec le serveur courant (None : JSON)
         # Attributs pour la correction automatique de désynchronisation
         self.position_report_interval = 5  # Intervalle de rapport en secondes
         self.last_position_report = 0
+        # Synchronisation d'horloge avec le serveur (ping/pong)
+        self.clock = ClockEstimator()
+        self.clock_sync_interval = 10  # Intervalle entre deux pings en secondes
+        self.clock_sync_burst = 4  # Pings rapprochés à la connexion pour converger vite
+        # Correction douce : petits décalages rattrapés en modifiant la vitesse de lecture
+        self.soft_sync_enabled = True
+        self.hard_sync_threshold = 3.0  # Au-delà de ce décalage (secondes), on fait un seek
+        self.max_rate_adjustment = 0.05  # Vitesse comprise entre 0.95x et 1.05x
+        self.soft_sync_duration = 10.0  # Durée visée pour rattraper un décalage (secondes)
+        self.soft_sync_timer = None
+        # État de la salle tel que connu par ce client (pour distinguer nos actions de celles de l'utilisateur)
+        self.state_seq = 0  # Dernière version de l'état de la salle appliquée
+        self.state_epoch = None  # Instance de la salle qui a numéroté ces versions
+        self.room_state = {}  # Dernier état appliqué (url, lecture, vitesse), base des états différentiels
+        self.current_url = None  # Vidéo actuellement ouverte dans le navigateur
+        self.expected_playing = False
+        self.playback_rate = 1.0
+        self.last_applied_seek = None  # (position, instant) du dernier seek appliqué sur ordre du serveur
+        self.last_applied_command = 0  # Instant de la dernière commande du serveur appliquée au lecteur
+        self.player_lock = threading.RLock()  # Sérialise l'accès au navigateur entre les threads
+        # Les commandes du lecteur sont exécutées par un thread dédié : la réception réseau
+        # n'attend jamais Selenium, et les commandes remplacées en attente sont fusionnées
+        self.player_messages = {"state", "auto_sync", "host_time_request"}
+        self.state_seek_tolerance = 0.5  # Écart (secondes) en dessous duquel un état reçu ne provoque pas de seek
+        # Commandes de l'hôte (lecture, pause, seek, vitesse) fusionnées pendant une courte fenêtre
+        # en un seul état envoyé au serveur (0 pour envoyer chaque commande immédiatement)
+        self.command_coalesce_window = 0.1
+        self.pending_state = {}
+        self.pending_state_timer = None
+        self.pending_state_lock = threading.Lock()
+        self.player_queue = CommandQueue()
+        # Surveillance du navigateur de l'hôte : ses actions directes sont transmises au serveur
+        self.host_watch_enabled = True
+        self.host_watch_interval = 0.25  # Intervalle de relève des événements (secondes)
+        self.host_watch_grace = 1.0  # Délai pendant lequel le lecteur applique une commande reçue
+        # Reconnexion automatique après une coupure : seuls les changements sont alors renvoyés
+        self.auto_reconnect = True
+        self.reconnect_delays = [1, 2, 5, 10]  # Attente avant chaque tentative (secondes)
+        self.max_reconnect_attempts = 10
         
     def connect(self):
         """Se connecte au serveur"""
         try:
-            self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            self.client_socket.connect((self.host, self.port))
-            self.connected = True
+            self.open_socket()
             self.running = True
             
             # Démarrer le thread de réception des messages
@@ -39,10 +85,26 @@ class Client:
             receive_thread.daemon = True
             receive_thread.start()
             
-            logger.info(f"Connecté au serveur {self.host}:{self.port}")
+            # Démarrer le thread qui applique les commandes au navigateur
+            player_thread = threading.Thread(target=self.player_worker_loop)
+            player_thread.daemon = True
+            player_thread.start()
+            
+            # Démarrer l'estimation du décalage d'horloge avec le serveur
+            clock_thread = threading.Thread(target=self.clock_sync_loop)
+            clock_thread.daemon = True
+            clock_thread.start()
+            
+            # L'hôte surveille son navigateur pour diffuser les actions faites directement dans YouTube
+            if self.is_host and self.host_watch_enabled:
+                watch_thread = threading.Thread(target=self.host_watch_loop)
+                watch_thread.daemon = True
+                watch_thread.start()
+            
+            logger.info(f"Connecté au serveur {self.host}:{self.port} (salle {self.room_id})")
             
             # Demander une synchronisation initiale
-            self.send_message({"type": "sync_request"})
+            self.send_message(self.sync_request_message())
             
             return True
         except Exception as e:
@@ -50,87 +112,168 @@ class Client:
             self.connected = False
             return False
             
+    def open_socket(self):
+        """Ouvre la connexion TCP vers le serveur et rejoint la salle
+
+        join_room est écrit avant que la connexion soit marquée active : aucun autre
+        message (ping, rapport de position) ne peut le précéder.
+        """
+        self.codec = None  # À renégocier : le serveur a pu changer
+        if self.client_socket:
+            try:
+                self.client_socket.close()  # Libère le descripteur de la tentative précédente
+            except:
+                pass
+
+        self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.client_socket.connect((self.host, self.port))
+        self.client_socket.sendall(encode_message({"type": "join_room", "room": self.room_id}))
+        self.connected = True
+        
+    def sync_request_message(self):
+        """Demande de synchronisation indiquant la dernière version d'état connue"""
+        if not self.state_seq:
+            return {"type": "sync_request"}  # Aucun état connu : le serveur envoie l'état complet
+        return {"type": "sync_request", "last_seq": self.state_seq, "epoch": self.state_epoch}
+        
+    def reconnect(self):
+        """Tente de rétablir la connexion après une coupure, renvoie True en cas de succès"""
+        for attempt in range(self.max_reconnect_attempts):
+            delay = self.reconnect_delays[min(attempt, len(self.reconnect_delays) - 1)]
+            logger.info(f"Connexion perdue, nouvelle tentative dans {delay} secondes")
+            time.sleep(delay)
+            if not self.running:
+                return False
+                
+            try:
+                self.open_socket()
+            except OSError as e:
+                logger.warning(f"Échec de la reconnexion au serveur: {e}")
+                continue
+                
+            logger.info(f"Reconnecté au serveur {self.host}:{self.port}")
+            self.send_message(self.sync_request_message())
+            return True
+        return False
+        
     def receive_messages(self):
-        """Reçoit et traite les messages du serveur"""
+        """Reçoit et traite les messages du serveur, en se reconnectant après une coupure"""
+        while self.running:
+            self.read_messages()
+            self.connected = False
+            if not (self.running and self.auto_reconnect and self.reconnect()):
+                break
+                
+        self.player_queue.close()
+        logger.info("Déconnecté du serveur")
+        
+    def read_messages(self):
+        """Lit les messages du socket courant jusqu'à sa fermeture"""
+        decoder = FrameDecoder()
         while self.running:
             try:
                 data = self.client_socket.recv(BUFFER_SIZE)
                 if not data:
                     break
-                    
-                message = json.loads(data.decode('utf-8'))
-                logger.info(f"Message reçu du serveur: {message}")
                 
-                self.process_message(message)
+                # Un même paquet peut contenir plusieurs messages (ex: seek suivi de play)
+                for payload in decoder.feed(data):
+                    try:
+                        message = decode_payload(payload)
+                    except ValueError:  # JSON, UTF-8 ou message binaire invalide
+                        logger.error("Message mal formaté reçu du serveur")
+                        continue
+                    
+                    logger.debug("Message reçu du serveur: %s", message)  # Formatage différé (chaque message)
+                    self.dispatch_message(message)
                 
-            except json.JSONDecodeError:
-                logger.error("Message mal formaté reçu du serveur")
+            except ProtocolError as e:
+                logger.error(f"Flux invalide reçu du serveur: {e}")
+                break
             except Exception as e:
                 if self.running:  # Ignorer les erreurs lors de la déconnexion
                     logger.error(f"Erreur lors de la réception d'un message: {e}")
                 break
-                
-        self.connected = False
-        logger.info("Déconnecté du serveur")
         
+    def dispatch_message(self, message):
+        """Confie les commandes du lecteur au thread dédié, traite les autres messages immédiatement"""
+        if message.get("type") in self.player_messages:
+            self.player_queue.put(message)
+        else:
+            self.process_message(message)
+            
+    def player_worker_loop(self):
+        """Applique au navigateur les commandes reçues, dans l'ordre (thread dédié)"""
+        while self.running and not self.player_queue.closed:
+            message = self.player_queue.get(timeout=1.0)
+            if message is None:
+                continue
+                
+            try:
+                with self.player_lock:
+                    self.process_message(message)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'application d'une commande au lecteur: {e}")
+                
     def process_message(self, message):
         """Traite un message reçu du serveur"""
         msg_type = message.get("type")
         
-        if msg_type == "video_info":
-            url = message.get("url")
-            state = message.get("state", {})
+        if msg_type == "welcome":
+            # Le serveur nous attribue un identifiant de connexion
+            self.client_id = message.get("id")
             
-            # Ouvrir la vidéo si elle n'est pas déjà ouverte
-            if not self.youtube_controller.is_initialized:
-                self.youtube_controller.initialize_browser()
-                
-            # Ouvrir la vidéo (sera mise en pause automatiquement par la méthode open_video)
-            self.youtube_controller.open_video(url)
-            
-            # Appliquer l'état (position et lecture/pause)
-            time_pos = state.get("time", 0)
-            playing = state.get("playing", False)
+            # Passer au codec binaire si le serveur le propose (un ancien serveur ne propose rien)
+            if self.binary_codec_enabled and BINARY_CODEC in message.get("codecs", ()):
+                self.send_message({"type": "hello", "codec": BINARY_CODEC})
+                self.codec = BINARY_CODEC
             
-            # D'abord chercher la position
-            self.youtube_controller.seek(time_pos)
+        elif msg_type == "room_joined":
+            # Nouvelle salle (ou serveur redémarré) : ses numéros de version repartent de zéro
+            self.room_id = message.get("room", self.room_id)
+            epoch = message.get("epoch")
+            if epoch != self.state_epoch:
+                self.state_epoch = epoch
+                self.state_seq = 0
+                self.room_state = {}
+                # Les états en attente sont numérotés par l'ancienne instance de la salle
+                self.player_queue.discard({"state", "auto_sync"})
             
-            # Ensuite appliquer l'état de lecture (par défaut: pause)
-            if playing:
-                # Seulement si explicitement en lecture
-                self.youtube_controller.play()
+        elif msg_type == "state":
+            # État versionné de la salle : une version déjà appliquée ou dépassée est ignorée.
+            # Un état différentiel (base_seq) ne contient que ce qui a changé depuis notre version.
+            seq = message.get("seq", 0)
+            base_seq = message.get("base_seq")
+            if base_seq is not None and base_seq == self.state_seq:
+                self.apply_room_state(dict(self.room_state, **message))
+            elif base_seq is None and seq > self.state_seq:
+                # L'URL n'est envoyée que lorsqu'elle change : même url_seq, même vidéo que la nôtre
+                if "url" not in message and message.get("url_seq") == self.room_state.get("url_seq"):
+                    message = dict(message, url=self.room_state.get("url"))
+                if "url" in message:
+                    self.apply_room_state(message)
+                else:
+                    # Changement de vidéo manqué (état remplacé en file) : redemander l'état
+                    logger.info(f"État {seq} sans la vidéo courante, nouvelle synchronisation")
+                    self.send_message(self.sync_request_message())
             else:
-                # Pour s'assurer que la vidéo est bien en pause
-                self.youtube_controller.pause()
-                
-        elif msg_type == "play":
-            if self.youtube_controller.is_initialized:
-                self.youtube_controller.play()
-                
-        elif msg_type == "pause":
-            if self.youtube_controller.is_initialized:
-                self.youtube_controller.pause()
-                
-        elif msg_type == "seek":
-            if self.youtube_controller.is_initialized:
-                time_pos = message.get("time", 0)
-                self.youtube_controller.seek(time_pos)
+                logger.info(f"État périmé ignoré (version {seq}, version actuelle {self.state_seq})")
                 
         elif msg_type == "host_time_request":
             # L'hôte doit répondre avec sa position actuelle
             # (cette partie ne sera exécutée que sur l'hôte)
             if self.is_host and self.youtube_controller.is_initialized:
                 requester = message.get("requester", None)
-                current_time = self.youtube_controller.get_current_time()
-                is_playing = self.youtube_controller.is_playing()
+                state = self.youtube_controller.get_state()
                 
                 # Envoyer notre position actuelle au serveur
-                self.send_message({
-                    "type": "host_time_response",
-                    "time": current_time,
-                    "playing": is_playing,
-                    "requester": requester
-                })
+                if state:
+                    self.send_message(self.stamp({
+                        "type": "host_time_response",
+                        "time": state["time"],
+                        "playing": state["playing"],
+                        "requester": requester
+                    }))
                 
         elif msg_type == "chat":
             # Traiter un message de chat
@@ -145,15 +288,61 @@ class Client:
         elif msg_type == "auto_sync":
             # Commande de synchronisation automatique
             if self.youtube_controller.is_initialized and not self.is_host:
-                time_pos = message.get("time", 0)
-                logger.info(f"Correction automatique reçue: alignement à {time_pos} secondes")
-                self.youtube_controller.seek(time_pos)
+                playing = message.get("playing", False)
+                
+                # Petit décalage pendant la lecture : ajuster la vitesse plutôt que de sauter
+                corrected = (self.soft_sync_enabled and playing
+                             and self.soft_correct(message.get("time", 0), message.get("sent_at")))
+                
+                if not corrected:
+                    time_pos = self.expected_position(message.get("time", 0), message.get("sent_at"), playing)
+                    logger.info(f"Correction automatique reçue: alignement à {time_pos} secondes")
+                    self.cancel_soft_correction()
+                    self.apply_seek(time_pos)
+                
+        elif msg_type == "pong":
+            # Réponse à un ping : mise à jour du RTT et du décalage d'horloge
+            t0, t1, t2 = message.get("t0"), message.get("t1"), message.get("t2")
+            if None not in (t0, t1, t2):
+                self.clock.add_sample(t0, t1, t2, time.time())
         
         # Appeler le gestionnaire générique si enregistré
         handler = self.message_handlers.get("message")
         if handler:
             handler(message)
             
+    def apply_room_state(self, state):
+        """Applique au lecteur un message state (la vidéo n'est rechargée que si elle a changé)"""
+        self.state_seq = state.get("seq", 0)
+        self.room_state = {key: state.get(key) for key in ("url", "url_seq", "playing", "rate")}
+        playing = state.get("playing", False)
+        self.expected_playing = playing
+        self.playback_rate = state.get("rate", 1.0)
+        self.last_applied_command = time.time()
+        
+        url = state.get("url")
+        if not url:
+            return  # Aucune vidéo définie pour l'instant
+            
+        seek_tolerance = self.state_seek_tolerance
+        if url != self.current_url or not self.youtube_controller.is_initialized:
+            # Lancer le navigateur s'il n'est pas déjà prêt (ou attendre la fin du préchauffage)
+            self.youtube_controller.ensure_browser()
+            
+            # Ouvrir la vidéo (l'état est appliqué juste après, en un seul appel au navigateur)
+            self.youtube_controller.open_video(url, pause_after_load=False)
+            self.current_url = url
+            seek_tolerance = 0
+            
+        # Position (extrapolée à l'instant présent), lecture/pause et vitesse en une seule commande
+        time_pos = self.expected_position(state.get("time", 0), state.get("sent_at"), playing)
+        self.cancel_soft_correction(reset_rate=False)
+        self.last_applied_seek = (time_pos, time.time())
+        self.youtube_controller.apply_state(time_pos, playing, self.playback_rate, seek_tolerance=seek_tolerance)
+        # Le chargement de la vidéo a pu durer plus que host_watch_grace : le délai de grâce
+        # court à partir de l'application effective, pour ne pas renvoyer l'écho comme action locale
+        self.last_applied_command = time.time()
+        
     def send_message(self, message):
         """Envoie un message au serveur"""
         if not self.connected:
@@ -161,8 +350,9 @@ class Client:
             return False
             
         try:
-            data = json.dumps(message).encode('utf-8')
-            self.client_socket.sendall(data)
+            data = encode_message(message, self.codec)
+            with self.send_lock:
+                self.client_socket.sendall(data)
             return True
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi d'un message au serveur: {e}")
@@ -171,6 +361,8 @@ class Client:
             
     def set_video(self, url):
         """Définit la vidéo à regarder"""
+        # Les commandes en attente concernent la vidéo précédente : les envoyer avant
+        self.flush_state_update()
         return self.send_message({
             "type": "set_video",
             "url": url
@@ -178,19 +370,64 @@ class Client:
         
     def play(self):
         """Lance la lecture de la vidéo"""
+        if self.command_coalesce_window > 0:
+            return self.queue_state_change(playing=True)
         return self.send_message({"type": "play"})
         
     def pause(self):
         """Met en pause la vidéo"""
+        if self.command_coalesce_window > 0:
+            return self.queue_state_change(playing=False)
         return self.send_message({"type": "pause"})
         
     def seek(self, time_pos):
         """Déplace la lecture à un moment précis"""
-        return self.send_message({
+        if self.command_coalesce_window > 0:
+            return self.queue_state_change(time=float(time_pos))
+        return self.send_message(self.stamp({
             "type": "seek",
             "time": float(time_pos)
+        }))
+        
+    def set_rate(self, rate):
+        """Modifie la vitesse de lecture pour toute la salle"""
+        if self.command_coalesce_window > 0:
+            return self.queue_state_change(rate=float(rate))
+        return self.send_message({
+            "type": "rate",
+            "rate": float(rate)
         })
         
+    def queue_state_change(self, **changes):
+        """Fusionne une commande dans l'état en attente, envoyé à la fin de la fenêtre de fusion"""
+        if not self.connected:
+            logger.error("Non connecté au serveur")
+            return False
+            
+        with self.pending_state_lock:
+            if "time" in changes:
+                self.pending_state.pop("sent_at", None)
+                self.stamp(changes)  # La position est datée au moment de la commande (horloge synchronisée)
+            self.pending_state.update(changes)
+            if self.pending_state_timer is None:
+                self.pending_state_timer = threading.Timer(self.command_coalesce_window, self.flush_state_update)
+                self.pending_state_timer.daemon = True
+                self.pending_state_timer.start()
+        return True
+        
+    def flush_state_update(self):
+        """Envoie immédiatement l'état en attente (s'il y en a un) sous forme d'un seul message"""
+        with self.pending_state_lock:
+            changes = self.pending_state
+            self.pending_state = {}
+            if self.pending_state_timer is not None:
+                self.pending_state_timer.cancel()
+                self.pending_state_timer = None
+                
+        if not changes:
+            return True
+        return self.send_message(dict(changes, type="state_update"))
+        
     def send_chat(self, content):
         """Envoie un message de chat"""
         return self.send_message({
@@ -208,7 +445,7 @@ class Client:
         current_time = time.time()
         if current_time - self.last_sync_time > 2:  # Limiter les requêtes de sync
             self.last_sync_time = current_time
-            return self.send_message({"type": "sync_request"})
+            return self.send_message(self.sync_request_message())
         return False
         
     def force_sync(self):
@@ -217,16 +454,18 @@ class Client:
             return False
             
         try:
-            # Obtenir l'état actuel de la vidéo locale
-            current_time = self.youtube_controller.get_current_time()
-            is_playing = self.youtube_controller.is_playing()
+            # Obtenir l'état actuel de la vidéo locale (un seul appel au navigateur)
+            state = self.youtube_controller.get_state()
+            if not state:
+                return False
             
-            # Envoyer l'état pour synchroniser tous les clients
-            return self.send_message({
+            # Envoyer l'état pour synchroniser tous les clients (après les commandes en attente)
+            self.flush_state_update()
+            return self.send_message(self.stamp({
                 "type": "force_sync",
-                "time": current_time,
-                "playing": is_playing
-            })
+                "time": state["time"],
+                "playing": state["playing"]
+            }))
         except Exception as e:
             logger.error(f"Erreur lors de la synchronisation forcée: {e}")
             return False
@@ -242,25 +481,185 @@ class Client:
             return False
             
         try:
-            # Obtenir la position actuelle
-            position = self.youtube_controller.get_current_time()
-            is_playing = self.youtube_controller.is_playing()
+            # Obtenir la position et l'état de lecture en un seul appel au navigateur
+            state = self.youtube_controller.get_state()
+            if not state:
+                return False
             
             # Envoyer la position au serveur
             self.last_position_report = current_time
-            return self.send_message({
+            return self.send_message(self.stamp({
                 "type": "report_position",
-                "time": position,
-                "playing": is_playing,
+                "time": state["time"],
+                "playing": state["playing"],
                 "is_host": self.is_host  # Indiquer si ce client est l'hôte
-            })
+            }))
         except Exception as e:
             logger.error(f"Erreur lors du rapport de position: {e}")
             return False
+            
+    def clock_sync_loop(self):
+        """Envoie périodiquement des pings pour estimer le RTT et le décalage d'horloge"""
+        burst = self.clock_sync_burst
+        while self.running:
+            if not self.connected:
+                time.sleep(1)  # Reconnexion en cours
+                continue
+                
+            self.send_message({
+                "type": "ping",
+                "t0": time.time(),
+                "rtt": self.clock.rtt,
+                "offset": self.clock.offset
+            })
+            
+            if burst > 1:
+                burst -= 1
+                time.sleep(0.2)
+            else:
+                time.sleep(self.clock_sync_interval)
+                
+    def host_watch_loop(self):
+        """Relève régulièrement les événements du navigateur de l'hôte (thread dédié)"""
+        while self.running:
+            if self.connected and self.youtube_controller.is_initialized:
+                try:
+                    with self.player_lock:
+                        self.check_host_events()
+                except Exception as e:
+                    logger.error(f"Erreur lors de la surveillance du navigateur: {e}")
+            time.sleep(self.host_watch_interval)
+            
+    def check_host_events(self):
+        """Transmet au serveur les lectures, pauses, seeks et changements de vitesse faits dans YouTube
+
+        Les événements provoqués par nos propres commandes (reçues du serveur) sont ignorés :
+        l'état observé est comparé à l'état attendu de la salle.
+        """
+        state = self.youtube_controller.get_state()
+        if not state:
+            return
+        events = self.youtube_controller.poll_events()
+        
+        # Lecture / pause (on ignore les états transitoires : chargement, fin de vidéo...)
+        # ainsi que le court délai pendant lequel le lecteur applique une commande reçue
+        settled = time.time() - self.last_applied_command > self.host_watch_grace
+        if settled and state["state"] in (1, 2) and state["playing"] != self.expected_playing:
+            self.expected_playing = state["playing"]
+            logger.info(f"Action locale détectée: {'lecture' if state['playing'] else 'pause'}")
+            if state["playing"]:
+                self.play()
+            else:
+                self.pause()
+            
+        # Seek effectué dans la page (hors seeks demandés par le serveur)
+        seeks = [event for event in events if event.get("type") == "seeked"]
+        if seeks and not self.is_own_seek(seeks[-1].get("time")):
+            logger.info(f"Seek local détecté: {state['time']:.1f} secondes")
+            self.last_applied_seek = (state["time"], time.time())
+            self.seek(state["time"])
+            
+        # Changement de vitesse dans le menu du lecteur
+        rate = state.get("rate") or 1.0
+        if abs(rate - self.playback_rate) > 0.01:
+            self.playback_rate = rate
+            logger.info(f"Vitesse locale détectée: {rate}x")
+            self.set_rate(rate)
+            
+    def apply_seek(self, time_pos):
+        """Exécute un seek demandé par le serveur en le mémorisant pour ne pas le renvoyer"""
+        self.last_applied_seek = (time_pos, time.time())
+        self.youtube_controller.seek(time_pos)
+        
+    def is_own_seek(self, position, tolerance=1.5, max_age=3.0):
+        """Indique si un seek observé dans la page correspond au dernier seek que nous avons appliqué"""
+        if self.last_applied_seek is None or position is None:
+            return False
+        target, applied_at = self.last_applied_seek
+        return time.time() - applied_at < max_age and abs(position - target) < tolerance
+        
+    def server_time(self):
+        """Heure actuelle exprimée dans l'horloge du serveur"""
+        return self.clock.to_server(time.time())
+        
+    def stamp(self, message):
+        """Ajoute à un message portant une position son instant d'envoi (horloge serveur)"""
+        if self.clock.synced:
+            message["sent_at"] = self.server_time()
+        return message
+        
+    def expected_position(self, time_pos, sent_at, playing, include_seek_cost=True):
+        """Position cible d'un seek pour une position relevée par le serveur à sent_at
+
+        Si la vidéo est en lecture, elle a avancé pendant le transit du message et
+        avancera encore pendant l'exécution du seek : on vise donc
+        time + (maintenant - sent_at) + coût moyen d'un seek.
+        """
+        if not playing:
+            return time_pos
+        
+        target = time_pos
+        if sent_at is not None and self.clock.synced:
+            target += max(0.0, self.server_time() - sent_at) * self.playback_rate
+        if include_seek_cost:
+            target += self.youtube_controller.seek_latency
+        return target
+        
+    def soft_correct(self, time_pos, sent_at):
+        """Rattrape un petit décalage en ajustant temporairement la vitesse de lecture
+
+        Renvoie False si le décalage dépasse hard_sync_threshold : un seek est alors nécessaire.
+        """
+        current = self.youtube_controller.get_current_time()
+        target = self.expected_position(time_pos, sent_at, True, include_seek_cost=False)
+        drift = target - current  # > 0 : en retard sur l'hôte, < 0 : en avance
+        
+        if abs(drift) > self.hard_sync_threshold:
+            return False
+            
+        adjustment = max(-self.max_rate_adjustment,
+                         min(self.max_rate_adjustment, drift / self.soft_sync_duration))
+        if abs(adjustment) < 0.001:
+            return True  # Décalage négligeable
+            
+        if not self.youtube_controller.set_playback_rate(self.playback_rate * (1.0 + adjustment)):
+            return False
+            
+        # Revenir à la vitesse normale une fois le décalage rattrapé
+        duration = drift / (adjustment * self.playback_rate)
+        self.cancel_soft_correction(reset_rate=False)
+        self.soft_sync_timer = threading.Timer(duration, self.end_soft_correction)
+        self.soft_sync_timer.daemon = True
+        self.soft_sync_timer.start()
+        
+        logger.info(f"Correction douce: décalage de {drift:.2f} s, "
+                    f"vitesse {self.playback_rate * (1.0 + adjustment):.3f} pendant {duration:.1f} s")
+        return True
+        
+    def cancel_soft_correction(self, reset_rate=True):
+        """Interrompt une correction douce en cours"""
+        with self.player_lock:
+            timer = self.soft_sync_timer
+            if timer:
+                timer.cancel()
+                self.soft_sync_timer = None
+                if reset_rate:
+                    self.youtube_controller.set_playback_rate(self.playback_rate)
+                
+    def end_soft_correction(self):
+        """Fin d'une correction douce : retour à la vitesse de la salle (thread du minuteur)"""
+        # Le navigateur est partagé avec le thread du lecteur et la surveillance de l'hôte
+        with self.player_lock:
+            if self.soft_sync_timer is not threading.current_thread():
+                return  # Correction annulée ou remplacée entre-temps
+            self.soft_sync_timer = None
+            if self.youtube_controller.is_initialized:
+                self.youtube_controller.set_playback_rate(self.playback_rate)
         
     def disconnect(self):
         """Se déconnecte du serveur"""
         self.running = False
+        self.player_queue.close()
         
         if self.client_socket:
             try:
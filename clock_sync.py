@@ -0,0 +1,57 @@
+# Estimation du décalage d'horloge entre un client et le serveur (à la manière de NTP)
+
+class ClockEstimator:
+    """Maintient un RTT et un décalage d'horloge lissés à partir d'échanges ping/pong
+
+    Pour chaque échange :
+      t0 = envoi du ping (horloge locale), t1 = réception par le serveur (horloge serveur),
+      t2 = envoi du pong (horloge serveur), t3 = réception du pong (horloge locale).
+    """
+
+    def __init__(self, alpha=0.125, outlier_factor=3.0, max_rejections=3):
+        self.alpha = alpha  # Poids d'un nouvel échantillon dans la moyenne mobile
+        self.outlier_factor = outlier_factor  # Au-delà de N fois le RTT lissé, l'échantillon est ignoré
+        # Après N rejets consécutifs, c'est le chemin réseau qui a changé (ou le premier RTT
+        # était anormalement bas) : l'estimation repart de l'échantillon courant
+        self.max_rejections = max_rejections
+        self.rejections = 0
+        self.rtt = None  # Temps aller-retour lissé (secondes)
+        self.offset = 0.0  # Horloge serveur - horloge locale (secondes)
+        self.samples = 0
+
+    @property
+    def synced(self):
+        return self.samples > 0
+
+    def add_sample(self, t0, t1, t2, t3):
+        """Intègre un échange ping/pong, renvoie False si l'échantillon a été rejeté"""
+        rtt = max(0.0, (t3 - t0) - (t2 - t1))
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+
+        if self.rtt is None:
+            self.rtt = rtt
+            self.offset = offset
+        else:
+            # Un RTT anormalement long (file d'attente, retransmission) fausse le décalage
+            if rtt > self.outlier_factor * max(self.rtt, 0.001):
+                self.rejections += 1
+                if self.rejections < self.max_rejections:
+                    return False
+                self.rtt = rtt
+                self.offset = offset
+            else:
+                self.rtt += self.alpha * (rtt - self.rtt)
+                self.offset += self.alpha * (offset - self.offset)
+
+        self.rejections = 0
+
+        self.samples += 1
+        return True
+
+    def to_server(self, local_time):
+        """Convertit un instant de l'horloge locale vers l'horloge du serveur"""
+        return local_time + self.offset
+
+    def to_local(self, server_time):
+        """Convertit un instant de l'horloge du serveur vers l'horloge locale"""
+        return server_time - self.offset
@@ -0,0 +1,73 @@
+# File de commandes du lecteur : seule la dernière intention de chaque type est exécutée
+
+import threading
+
+# Pour chaque type de commande, les commandes en attente qu'elle rend inutiles
+PLAYER_SUPERSEDES = {
+    "state": {"state", "auto_sync"},  # Chaque état est complet : seul le dernier compte
+    "auto_sync": {"auto_sync"}
+}
+
+class CommandQueue:
+    """File d'attente bloquante qui fusionne les commandes devenues obsolètes
+
+    Quand une commande arrive, les commandes encore en attente qu'elle remplace
+    (selon supersedes) sont retirées : le consommateur n'exécute que l'état final voulu.
+    Les types absents de supersedes (ex: host_time_request) ne sont jamais fusionnés.
+    Un message versionné (seq) ne remplace pas une commande de même type plus récente :
+    c'est lui qui est alors abandonné.
+    """
+
+    def __init__(self, supersedes=PLAYER_SUPERSEDES):
+        self.supersedes = supersedes
+        self.pending = []
+        self.condition = threading.Condition()
+        self.closed = False
+        self.coalesced = 0  # Nombre de commandes retirées car remplacées
+
+    def put(self, message):
+        """Ajoute une commande en retirant celles qu'elle remplace"""
+        msg_type = message.get("type")
+        replaced = self.supersedes.get(msg_type, ())
+        with self.condition:
+            if replaced:
+                if self.has_newer(msg_type, message.get("seq")):
+                    self.coalesced += 1
+                    return
+                kept = [pending for pending in self.pending if pending.get("type") not in replaced]
+                self.coalesced += len(self.pending) - len(kept)
+                self.pending = kept
+            self.pending.append(message)
+            self.condition.notify()
+
+    def has_newer(self, msg_type, seq):
+        """Indique si une commande du même type et de version plus récente est en attente (appelé sous verrou)"""
+        if seq is None:
+            return False
+        return any(pending.get("type") == msg_type and pending.get("seq", -1) > seq
+                   for pending in self.pending)
+
+    def discard(self, msg_types):
+        """Retire les commandes en attente des types donnés (ex: états d'une salle abandonnée)"""
+        with self.condition:
+            self.pending = [pending for pending in self.pending if pending.get("type") not in msg_types]
+
+    def get(self, timeout=None):
+        """Renvoie la prochaine commande, ou None si la file est fermée ou le délai écoulé"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if not self.pending:
+                return None
+            return self.pending.pop(0)
+
+    def close(self):
+        """Réveille le consommateur pour qu'il s'arrête"""
+        with self.condition:
+            self.closed = True
+            self.pending.clear()
+            self.condition.notify_all()
+
+    def __len__(self):
+        with self.condition:
+            return len(self.pending)
@@ -6,15 +6,12 @@ import time
 import socket
 import threading
 import logging
-from utils_config import THEMES, PORT, set_app_icon, setup_ngrok, get_public_ip, logger
-from server import Server
-from client import Client
-from pyngrok import ngrok
+from utils_config import THEMES, PORT, DEFAULT_ROOM, set_app_icon, setup_ngrok, stop_ngrok, get_public_ip, logger
 
 class WatchPartyApp:
     """Interface graphique pour l'application Watch Party"""
     
-    def __init__(self, master):
+    def __init__(self, master, prewarm_browser=False):
         self.master = master
         self.master.title("Watch Party")
         self.master.geometry("800x600")
@@ -27,9 +24,12 @@ class WatchPartyApp:
         self.is_host = False
         self.server = None
         self.client = None
+        self.youtube_controller = None  # Navigateur préchauffé, confié au client à la connexion
+        self.browser_status_timer = None
         self.server_addr = tk.StringVar(value="localhost")
         self.server_port = tk.IntVar(value=PORT)
         self.username = tk.StringVar(value="User" + str(int(time.time()) % 1000))
+        self.room_var = tk.StringVar(value=DEFAULT_ROOM)
         self.video_url = tk.StringVar(value="https://www.youtube.com/watch?v=jNQXAC9IVRw")  # Vidéo test par défaut
         
         # Thème actuel (par défaut: clair)
@@ -38,6 +38,10 @@ class WatchPartyApp:
         # Configuration de l'interface
         self.setup_ui()
         
+        # Lancer le navigateur dès le démarrage si demandé
+        if prewarm_browser:
+            self.prewarm_browser()
+        
     def setup_ui(self):
         """Configure l'interface utilisateur"""
         # Configurer le thème initial
@@ -67,6 +71,20 @@ class WatchPartyApp:
         self.client_button = ttk.Button(mode_frame, text="Rejoindre comme Client", command=self.show_client_dialog)
         self.client_button.pack(side=tk.LEFT, padx=5)
         
+        # Choix du moteur réseau du serveur (asyncio pour les salons nombreux)
+        self.async_server_var = tk.BooleanVar(value=False)
+        self.async_server_check = ttk.Checkbutton(mode_frame, text="Serveur asyncio", variable=self.async_server_var)
+        self.async_server_check.pack(side=tk.LEFT, padx=5)
+        
+        # Préchauffage du navigateur à l'ouverture des boîtes de dialogue de connexion
+        self.prewarm_var = tk.BooleanVar(value=True)
+        self.prewarm_check = ttk.Checkbutton(mode_frame, text="Préchauffer le navigateur", 
+                                             variable=self.prewarm_var, command=self.toggle_prewarm)
+        self.prewarm_check.pack(side=tk.LEFT, padx=5)
+        
+        self.browser_status_var = tk.StringVar(value="Navigateur: arrêté")
+        ttk.Label(mode_frame, textvariable=self.browser_status_var).pack(side=tk.LEFT, padx=5)
+        
         # Bouton pour changer de thème
         self.theme_button = ttk.Button(mode_frame, text="Mode Sombre", command=self.toggle_theme)
         self.theme_button.pack(side=tk.RIGHT, padx=5)
@@ -87,6 +105,10 @@ class WatchPartyApp:
         self.username_entry = tk.Entry(network_frame, textvariable=self.username, width=15)
         self.username_entry.pack(side=tk.LEFT, padx=5)
         
+        ttk.Label(network_frame, text="Salle:").pack(side=tk.LEFT, padx=5)
+        self.room_entry = tk.Entry(network_frame, textvariable=self.room_var, width=10)
+        self.room_entry.pack(side=tk.LEFT, padx=5)
+        
         # Section vidéo
         video_frame = ttk.LabelFrame(main_frame, text="Contrôle vidéo")
         video_frame.pack(fill=tk.X, padx=5, pady=5)
@@ -182,6 +204,52 @@ class WatchPartyApp:
         # Gestion de la fermeture de l'application
         self.master.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def toggle_prewarm(self):
+        """Active ou désactive le préchauffage du navigateur"""
+        if self.prewarm_var.get():
+            self.prewarm_browser()
+        elif self.youtube_controller:
+            # Navigateur préchauffé mais pas encore utilisé par une session : le fermer
+            self.youtube_controller.close()
+            self.youtube_controller = None
+            self.update_browser_status()
+            
+    def prewarm_browser(self):
+        """Lance le navigateur en arrière-plan pour qu'il soit prêt à la connexion"""
+        if self.client:
+            return  # Le navigateur de la session en cours est déjà utilisé
+            
+        if not self.youtube_controller:
+            from youtube_controller import YouTubeController
+            self.youtube_controller = YouTubeController()
+        self.youtube_controller.prewarm()
+        self.update_browser_status()
+        
+    def take_browser(self):
+        """Confie le navigateur préchauffé (s'il existe) au client qui va se connecter"""
+        controller = self.youtube_controller
+        self.youtube_controller = None
+        return controller
+        
+    def update_browser_status(self):
+        """Affiche l'état du navigateur (vérifié régulièrement pendant son lancement)"""
+        controller = self.client.youtube_controller if self.client else self.youtube_controller
+        warm_state = controller.warm_state if controller else "idle"
+        labels = {
+            "idle": "arrêté",
+            "starting": "démarrage...",
+            "ready": "prêt",
+            "failed": "échec du lancement"
+        }
+        self.browser_status_var.set(f"Navigateur: {labels.get(warm_state, warm_state)}")
+        
+        # Pendant une session, le navigateur peut aussi être lancé à la première vidéo reçue
+        if self.browser_status_timer:
+            self.master.after_cancel(self.browser_status_timer)
+            self.browser_status_timer = None
+        if warm_state == "starting" or (self.client and warm_state == "idle"):
+            self.browser_status_timer = self.master.after(500, self.update_browser_status)
+            
     def toggle_auto_sync(self):
         """Active ou désactive la synchronisation automatique"""
         if self.client:
@@ -199,6 +267,10 @@ class WatchPartyApp:
                     self.sync_timer = None
                 self.add_system_message("Correction automatique de désynchronisation désactivée")
     
+    def get_room_id(self):
+        """Renvoie la salle saisie, ou la salle par défaut si le champ est vide"""
+        return self.room_var.get().strip() or DEFAULT_ROOM
+    
     def apply_sync_threshold(self):
         """Applique le nouveau seuil de synchronisation"""
         if not self.client or not self.is_host:
@@ -209,10 +281,10 @@ class WatchPartyApp:
             if threshold <= 0:
                 raise ValueError("Le seuil doit être positif")
                 
-            # Envoyer le seuil au serveur
+            # Le seuil ne concerne que la salle de l'hôte (les autres salles du serveur gardent le leur)
             if self.server:
-                self.server.sync_threshold = threshold
-                self.add_system_message(f"Seuil de synchronisation défini à {threshold} secondes")
+                self.server.get_room(self.client.room_id).sync_threshold = threshold
+                self.add_system_message(f"Seuil de synchronisation de la salle {self.client.room_id} défini à {threshold} secondes")
         except ValueError:
             messagebox.showerror("Erreur", "Veuillez entrer un nombre positif valide")
     
@@ -265,6 +337,10 @@ class WatchPartyApp:
         
     def show_host_dialog(self):
         """Affiche la boîte de dialogue pour le mode hôte"""
+        # Lancer le navigateur pendant que l'utilisateur remplit les boîtes de dialogue
+        if self.prewarm_var.get():
+            self.prewarm_browser()
+            
         # Demander le nom d'utilisateur
         dialog = tk.Toplevel(self.master)
         dialog.title("Nom d'utilisateur")
@@ -305,12 +381,17 @@ class WatchPartyApp:
         self.server_addr_entry.config(state=tk.DISABLED)
         self.server_port_entry.config(state=tk.DISABLED)
         self.username_entry.config(state=tk.DISABLED)
+        self.room_entry.config(state=tk.DISABLED)
         
         # Démarrer le serveur avec les options choisies
         self.start_as_host(use_ngrok)
     
     def show_client_dialog(self):
         """Affiche les boîtes de dialogue pour le mode client"""
+        # Lancer le navigateur pendant que l'utilisateur remplit les boîtes de dialogue
+        if self.prewarm_var.get():
+            self.prewarm_browser()
+            
         # Demander l'adresse du serveur
         server_dialog = tk.Toplevel(self.master)
         server_dialog.title("Adresse du serveur")
@@ -368,6 +449,13 @@ class WatchPartyApp:
         if not username:
             return  # L'utilisateur a annulé
         
+        # Sur un serveur dédié (python main.py --server), l'hôte se connecte comme un client
+        as_host = messagebox.askyesno("Rôle",
+                                      "Piloter la vidéo de cette salle en tant qu'hôte ?\n\n"
+                                      "(Uniquement si le serveur est un serveur dédié sans hôte :\n"
+                                      "si la salle a déjà un hôte, il reste la référence)",
+                                      default=messagebox.NO)
+        
         # Mettre à jour les valeurs dans l'interface
         self.server_addr.set(server_addr)
         self.server_port.set(server_port)
@@ -377,9 +465,10 @@ class WatchPartyApp:
         self.server_addr_entry.config(state=tk.DISABLED)
         self.server_port_entry.config(state=tk.DISABLED)
         self.username_entry.config(state=tk.DISABLED)
+        self.room_entry.config(state=tk.DISABLED)
         
         # Démarrer le client avec les paramètres
-        self.start_as_client()
+        self.start_as_client(as_host)
     
     def start_as_host(self, use_ngrok=False):
         """Démarre l'application en mode hôte"""
@@ -394,8 +483,13 @@ class WatchPartyApp:
         try:
             port = self.server_port.get()
             
-            # Créer et démarrer le serveur
-            self.server = Server(port=port)
+            # Créer et démarrer le serveur (moteur asyncio ou un thread par client)
+            # Importés à la demande : la fenêtre s'affiche sans attendre le réseau ni Selenium
+            from server import Server, AsyncServer
+            from client import Client
+            
+            server_class = AsyncServer if self.async_server_var.get() else Server
+            self.server = server_class(port=port)
             
             # Initialiser le seuil de synchronisation
             try:
@@ -411,7 +505,8 @@ class WatchPartyApp:
                 return
                 
             # Se connecter en tant que client au serveur local
-            self.client = Client(host='localhost', port=port)
+            self.client = Client(host='localhost', port=port, youtube_controller=self.take_browser(),
+                                 room_id=self.get_room_id())
             self.client.username = self.username.get()
             self.client.is_host = True  # Marquer ce client comme étant l'hôte
             
@@ -601,8 +696,8 @@ class WatchPartyApp:
         y = (info_window.winfo_screenheight() // 2) - (height // 2)
         info_window.geometry(f"{width}x{height}+{x}+{y}")
             
-    def start_as_client(self):
-        """Démarre l'application en mode client"""
+    def start_as_client(self, as_host=False):
+        """Démarre l'application en mode client (as_host : hôte d'une salle d'un serveur dédié)"""
         if self.client or self.server:
             self.disconnect()
             
@@ -616,9 +711,11 @@ class WatchPartyApp:
             port = self.server_port.get()
             
             # Se connecter au serveur
-            self.client = Client(host=host, port=port)
+            from client import Client
+            self.client = Client(host=host, port=port, youtube_controller=self.take_browser(),
+                                 room_id=self.get_room_id())
             self.client.username = self.username.get()
-            self.client.is_host = False  # Marquer ce client comme n'étant pas l'hôte
+            self.client.is_host = as_host  # Hôte uniquement sur un serveur dédié
             
             if not self.client.connect():
                 messagebox.showerror("Erreur", "Impossible de se connecter au serveur")
@@ -629,13 +726,14 @@ class WatchPartyApp:
             self.client.register_handler("chat", self.handle_chat_message)
             
             # Mettre à jour l'interface
-            self.is_host = False
+            self.is_host = as_host
+            role = "hôte" if as_host else "client"
             self.update_ui_connection_state(True)
-            self.status_var.set(f"Connecté au serveur {host}:{port} en tant que client")
+            self.status_var.set(f"Connecté au serveur {host}:{port} en tant que {role}")
             
             # Ajouter un message dans le chat
-            self.add_system_message(f"Connecté au serveur {host}:{port}")
-            self.add_system_message(f"Connecté en tant que client : {self.client.username}")
+            self.add_system_message(f"Connecté au serveur {host}:{port} (salle {self.client.room_id})")
+            self.add_system_message(f"Connecté en tant que {role} : {self.client.username}")
             
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur lors de la connexion au serveur: {e}")
@@ -649,6 +747,7 @@ class WatchPartyApp:
         # Boutons de connexion (inversé pour les boutons de connexion)
         self.host_button.config(state=tk.DISABLED if connected else tk.NORMAL)
         self.client_button.config(state=tk.DISABLED if connected else tk.NORMAL)
+        self.async_server_check.config(state=tk.DISABLED if connected else tk.NORMAL)
         
         # Contrôles vidéo
         self.video_url_entry.config(state=host_only_state)  # Restriction: seulement l'hôte peut modifier l'URL
@@ -659,9 +758,10 @@ class WatchPartyApp:
         self.seek_button.config(state=host_only_state)       # Seulement l'hôte peut chercher
         self.sync_button.config(state=host_only_state)       # Seulement l'hôte peut synchroniser
         
-        # Contrôles de synchronisation
-        self.sync_threshold_entry.config(state=host_only_state)
-        self.apply_threshold_button.config(state=host_only_state)
+        # Contrôles de synchronisation (le seuil n'est réglable que sur le serveur local)
+        threshold_state = host_only_state if self.server else tk.DISABLED
+        self.sync_threshold_entry.config(state=threshold_state)
+        self.apply_threshold_button.config(state=threshold_state)
         
         # Contrôles chat
         self.chat_input.config(state=state)
@@ -677,6 +777,8 @@ class WatchPartyApp:
             if hasattr(self, 'sync_timer') and self.sync_timer:
                 self.master.after_cancel(self.sync_timer)
                 self.sync_timer = None
+                
+        self.update_browser_status()
         
     def disconnect(self):
         """Déconnecte du serveur et arrête le serveur si en mode hôte"""
@@ -689,10 +791,7 @@ class WatchPartyApp:
             self.server = None
             
         # Arrêter ngrok si actif
-        try:
-            ngrok.kill()
-        except:
-            pass
+        stop_ngrok()
             
         self.is_host = False
         self.update_ui_connection_state(False)
@@ -703,6 +802,7 @@ class WatchPartyApp:
         self.server_addr_entry.config(state=tk.NORMAL)
         self.server_port_entry.config(state=tk.NORMAL)
         self.username_entry.config(state=tk.NORMAL)
+        self.room_entry.config(state=tk.NORMAL)
         
     def set_video(self):
         """Définit la vidéo à regarder"""
@@ -823,4 +923,10 @@ class WatchPartyApp:
         """Gère la fermeture de l'application"""
         if messagebox.askokcancel("Quitter", "Voulez-vous vraiment quitter ?"):
             self.disconnect()
+            
+            # Fermer le navigateur préchauffé s'il n'a pas été utilisé
+            # (en laissant au préchauffage en cours le temps de fermer le navigateur qu'il lance)
+            if self.youtube_controller:
+                self.youtube_controller.close(wait=self.youtube_controller.load_timeout)
+                
             self.master.destroy()
\ No newline at end of file
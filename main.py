@@ -4,18 +4,19 @@
 """
 Watch Party - Application pour regarder des vidéos YouTube de façon synchronisée
 Point d'entrée principal de l'application
+Usage: python main.py [--prewarm | --test | --server [options du serveur]]
 """
 
-import tkinter as tk
 import sys
 import logging
-from gui import WatchPartyApp
-from utils_config import set_app_icon
 
 def run_integration_test():
     """Fonction de test automatisé avec une instance serveur et client"""
     import threading
     import time
+    import tkinter as tk
+    from gui import WatchPartyApp
+    from utils_config import set_app_icon
     
     # Démarrer une instance serveur dans un thread séparé
     def start_server():
@@ -76,16 +77,25 @@ def run_integration_test():
 def main():
     """Point d'entrée principal de l'application"""
     # Vérifier les arguments de ligne de commande
-    if "--test" in sys.argv:
+    if "--server" in sys.argv:
+        # Serveur dédié : ni Tkinter ni Selenium ne sont chargés
+        from server import main as run_server
+        sys.exit(run_server([arg for arg in sys.argv[1:] if arg != "--server"]))
+    elif "--test" in sys.argv:
         run_integration_test()
     else:
+        import tkinter as tk
+        from gui import WatchPartyApp
+        from utils_config import set_app_icon
+        
         root = tk.Tk()
         root.title("Watch Party")
         
         # Appliquer l'icône
         set_app_icon(root)
         
-        app = WatchPartyApp(root)
+        # --prewarm : lancer le navigateur dès le démarrage de l'application
+        app = WatchPartyApp(root, prewarm_browser="--prewarm" in sys.argv)
         root.mainloop()
 
 if __name__ == "__main__":
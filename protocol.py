@@ -0,0 +1,136 @@
+# Protocole réseau : découpage du flux TCP en messages
+
+import json
+import struct
+
+# Chaque message est précédé de sa longueur sur 4 octets (big-endian)
+HEADER = struct.Struct("!I")
+HEADER_SIZE = HEADER.size
+MAX_FRAME_SIZE = 1024 * 1024  # Taille maximale d'un message (1 Mo)
+
+# Codec binaire optionnel, négocié à la connexion (welcome / hello)
+BINARY_CODEC = "struct-v1"
+
+# Messages fréquents encodés en binaire : type -> (code, [(champ, format struct)])
+# Une charge utile JSON commence toujours par "{" : un premier octet différent désigne le code
+BINARY_MESSAGES = {
+    "report_position": (1, [("time", "d"), ("playing", "?"), ("is_host", "?"), ("sent_at", "d")]),
+    "auto_sync": (2, [("time", "d"), ("playing", "?"), ("sent_at", "d")]),
+    "state": (3, [("seq", "I"), ("base_seq", "I"), ("url_seq", "I"), ("time", "d"), ("playing", "?"),
+                  ("rate", "d"), ("sent_at", "d")]),
+    "state_update": (4, [("time", "d"), ("playing", "?"), ("rate", "d"), ("sent_at", "d")]),
+    "seek": (5, [("time", "d"), ("sent_at", "d")]),
+    "ping": (6, [("t0", "d"), ("rtt", "d"), ("offset", "d")]),
+    "pong": (7, [("t0", "d"), ("t1", "d"), ("t2", "d")]),
+    "host_time_request": (8, [("requester", "I")]),
+    "host_time_response": (9, [("requester", "I"), ("time", "d"), ("playing", "?"), ("sent_at", "d")])
+}
+
+class ProtocolError(Exception):
+    """Erreur levée lorsque le flux reçu ne respecte pas le protocole"""
+
+class BinaryLayout:
+    """Disposition fixe d'un message binaire : code, masque des champs présents, puis les champs"""
+
+    def __init__(self, msg_type, code, fields):
+        self.type = msg_type
+        self.code = code
+        self.names = [name for name, _ in fields]
+        self.index = {name: position for position, name in enumerate(self.names)}
+        self.defaults = [False if fmt == "?" else 0 for _, fmt in fields]
+        self.struct = struct.Struct("!BB" + "".join(fmt for _, fmt in fields))
+
+    def pack(self, message):
+        """Encode le message, ou renvoie None s'il ne tient pas dans la disposition"""
+        mask = 0
+        values = list(self.defaults)
+        for key, value in message.items():
+            if key == "type" or value is None:
+                continue  # Un champ absent et un champ à None se lisent de la même façon (get)
+            position = self.index.get(key)
+            if position is None:
+                return None  # Champ imprévu (ex: url d'un état complet) : JSON
+            mask |= 1 << position
+            values[position] = value
+        try:
+            return self.struct.pack(self.code, mask, *values)
+        except struct.error:
+            return None  # Valeur hors format (ex: numéro négatif) : JSON
+
+    def unpack(self, payload):
+        """Décode une charge utile binaire de ce type"""
+        if len(payload) != self.struct.size:
+            raise ValueError(f"Taille invalide pour un message binaire {self.type}")
+        _, mask, *values = self.struct.unpack(payload)
+        message = {"type": self.type}
+        for position, name in enumerate(self.names):
+            if mask & (1 << position):
+                message[name] = values[position]
+        return message
+
+BINARY_LAYOUTS = {msg_type: BinaryLayout(msg_type, code, fields)
+                  for msg_type, (code, fields) in BINARY_MESSAGES.items()}
+BINARY_LAYOUTS_BY_CODE = {layout.code: layout for layout in BINARY_LAYOUTS.values()}
+
+def encode_message(message, codec=None):
+    """Sérialise un message en une trame prête à être envoyée sur le socket
+
+    Avec codec=BINARY_CODEC, les messages fréquents sont encodés en binaire ;
+    les autres (chat, vidéo, ...) restent en JSON.
+    """
+    payload = None
+    if codec == BINARY_CODEC:
+        layout = BINARY_LAYOUTS.get(message.get("type"))
+        if layout is not None:
+            payload = layout.pack(message)
+    if payload is None:
+        payload = json.dumps(message).encode('utf-8')
+    return HEADER.pack(len(payload)) + payload
+
+def decode_payload(payload):
+    """Désérialise la charge utile d'une trame (JSON ou binaire)
+
+    Lève une ValueError (dont json.JSONDecodeError) si la charge utile est invalide.
+    """
+    if payload[:1] != b"{":
+        layout = BINARY_LAYOUTS_BY_CODE.get(payload[0]) if payload else None
+        if layout is None:
+            raise ValueError("Message binaire inconnu")
+        return layout.unpack(payload)
+    return json.loads(payload.decode('utf-8'))
+
+class FrameDecoder:
+    """Réassemble les trames à partir des morceaux reçus sur un socket TCP"""
+
+    def __init__(self, max_frame_size=MAX_FRAME_SIZE):
+        self.buffer = bytearray()
+        self.max_frame_size = max_frame_size
+
+    def feed(self, data):
+        """Ajoute des données reçues et renvoie la liste des charges utiles complètes
+
+        Un seul appel à recv() peut contenir plusieurs trames (ou une trame partielle) :
+        les octets restants sont conservés jusqu'au prochain appel.
+        """
+        self.buffer.extend(data)
+        payloads = []
+        offset = 0
+        buffer_len = len(self.buffer)
+
+        while buffer_len - offset >= HEADER_SIZE:
+            (length,) = HEADER.unpack_from(self.buffer, offset)
+            if length > self.max_frame_size:
+                raise ProtocolError(f"Trame trop grande ({length} octets)")
+
+            end = offset + HEADER_SIZE + length
+            if end > buffer_len:
+                break  # Trame incomplète, attendre la suite
+
+            payloads.append(bytes(self.buffer[offset + HEADER_SIZE:end]))
+            offset = end
+
+        # Supprimer en une seule fois les octets déjà consommés
+        if offset:
+            del self.buffer[:offset]
+
+        return payloads
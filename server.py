@@ -1,28 +1,430 @@
 # Logique du serveur
 
+import os
+import sys
+import signal
+import argparse
 import socket
 import threading
-import json
+import asyncio
 import time
 import logging
-from utils_config import PORT, BUFFER_SIZE, logger
+import math
+import itertools
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from utils_config import PORT, BUFFER_SIZE, DEFAULT_ROOM, logger
+from protocol import FrameDecoder, ProtocolError, BINARY_CODEC, encode_message, decode_payload
+
+class ClientConnection(ABC):
+    """Connexion d'un client côté serveur, avec sa propre file d'envoi bornée
+
+    Les messages sont mis en file par broadcast / send_to_client puis envoyés par un
+    écrivain dédié : un client lent ne bloque donc plus l'envoi vers les autres.
+    Chaque transport (socket bloquant, flux asyncio) fournit wake_writer et close_transport.
+    """
+
+    def __init__(self, addr, server):
+        self.addr = tuple(addr[:2])
+        self.server = server
+        # Informations de session (l'identifiant est attribué par ClientRegistry)
+        self.id = None
+        self.username = None
+        self.role = "viewer"  # "host" ou "viewer"
+        self.position = None  # {"time": secondes, "timestamp": heure serveur}
+        self.room = None  # Salle rejointe (Room)
+        self.codec = None  # Codec négocié pour les messages fréquents (None : JSON)
+        # Estimation d'horloge rapportée par le client (échanges ping/pong)
+        self.rtt = None  # Temps aller-retour lissé (secondes)
+        self.clock_offset = None  # Horloge serveur - horloge client (secondes)
+        self.queue = deque()  # Éléments (données, type de message, version de l'état ou None)
+        self.lock = threading.Lock()
+        self.closed = False
+        self.backlog_since = None  # Instant depuis lequel des messages attendent d'être envoyés
+
+    def getpeername(self):
+        return self.addr
+
+    def send(self, data, msg_type=None, version=None):
+        """Met un message en file d'envoi, renvoie False si la connexion est fermée
+
+        version (instance de la salle, seq) identifie un message state : un état plus
+        ancien qu'un état déjà en file est abandonné au lieu de le remplacer.
+        """
+        with self.lock:
+            if self.closed:
+                return False
+
+            now = time.time()
+            stalled = (self.backlog_since is not None
+                       and now - self.backlog_since > self.server.slow_client_timeout)
+
+            if not stalled and len(self.queue) >= self.server.outbound_queue_size:
+                # File pleine : abandonner le plus ancien message non essentiel
+                stalled = not self.drop_oldest()
+
+            if not stalled:
+                # Un nouvel état rend inutiles les commandes de lecture encore en attente
+                replaced = self.server.superseded_messages.get(msg_type)
+                if replaced and self.queue:
+                    if self.has_newer(msg_type, version):
+                        return True  # Un état plus récent attend déjà d'être envoyé
+                    self.drop_superseded(replaced)
+                self.queue.append((data, msg_type, version))
+                if self.backlog_since is None:
+                    self.backlog_since = now
+
+        if stalled:
+            logger.warning(f"Client {self.addr[0]}:{self.addr[1]} trop lent, déconnexion")
+            self.close()
+            return False
+
+        self.wake_writer()
+        return True
+
+    def drop_oldest(self):
+        """Supprime le plus ancien message abandonnable de la file (appelé sous verrou)"""
+        for index, (_, msg_type, _) in enumerate(self.queue):
+            if msg_type in self.server.droppable_messages:
+                del self.queue[index]
+                return True
+        return False
+
+    def has_newer(self, msg_type, version):
+        """Indique si la file contient un message du même type et de version plus récente (appelé sous verrou)
+
+        Les versions ne sont comparées qu'au sein d'une même instance de salle.
+        """
+        if version is None:
+            return False
+        return any(queued_type == msg_type and queued_version is not None
+                   and queued_version[0] == version[0] and queued_version[1] > version[1]
+                   for _, queued_type, queued_version in self.queue)
+
+    def drop_superseded(self, replaced):
+        """Retire de la file les messages des types remplacés (appelé sous verrou)"""
+        self.queue = deque(item for item in self.queue if item[1] not in replaced)
+
+    def take_batch(self):
+        """Récupère tous les messages en attente, ou None si la connexion est fermée"""
+        with self.lock:
+            if self.closed:
+                return None
+            batch = [data for data, _, _ in self.queue]
+            self.queue.clear()
+            return batch
+
+    def mark_sent(self):
+        """Signale qu'un lot a été envoyé : le retard repart de zéro"""
+        with self.lock:
+            self.backlog_since = time.time() if self.queue else None
+
+    def close(self):
+        """Ferme la connexion et arrête son écrivain"""
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+            self.queue.clear()
+        self.wake_writer()
+        self.close_transport()
+
+    @abstractmethod
+    def wake_writer(self):
+        """Signale à l'écrivain que des messages attendent (ou que la connexion est fermée)"""
+
+    @abstractmethod
+    def close_transport(self):
+        """Ferme le transport sous-jacent"""
+
+
+class SocketConnection(ClientConnection):
+    """Connexion d'un client sur un socket bloquant, vidée par un thread écrivain"""
+
+    def __init__(self, client_socket, addr, server):
+        super().__init__(addr, server)
+        self.socket = client_socket
+        self.condition = threading.Condition(self.lock)
+
+        writer_thread = threading.Thread(target=self.write_loop)
+        writer_thread.daemon = True
+        writer_thread.start()
+
+    def recv(self, size):
+        return self.socket.recv(size)
+
+    def wake_writer(self):
+        with self.condition:
+            self.condition.notify()
+
+    def write_loop(self):
+        """Envoie les messages en file jusqu'à la fermeture de la connexion"""
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+
+            batch = self.take_batch()
+            if batch is None:
+                break
+
+            try:
+                for data in batch:
+                    self.socket.sendall(data)
+            except Exception as e:
+                if not self.closed:  # Ignorer les erreurs dues à une fermeture volontaire
+                    logger.error(f"Erreur lors de l'envoi d'un message à un client: {e}")
+                self.close()
+                break
+
+            self.mark_sent()
+
+    def close_transport(self):
+        try:
+            self.socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self.socket.close()
+        except OSError:
+            pass
+
+
+class ClientRegistry:
+    """Registre des connexions actives indexées par identifiant (recherches en O(1))"""
+
+    def __init__(self):
+        self.sessions = {}  # {id: ClientConnection}
+        self.ids = itertools.count(1)
+        self.lock = threading.Lock()
+
+    def add(self, client):
+        """Enregistre une connexion et lui attribue un identifiant compact"""
+        with self.lock:
+            client.id = next(self.ids)
+            self.sessions[client.id] = client
+        return client.id
+
+    def remove(self, client):
+        with self.lock:
+            return self.sessions.pop(client.id, None) is not None
+
+    def get(self, client_id):
+        return self.sessions.get(client_id)
+
+    def snapshot(self):
+        """Copie de la liste des connexions, parcourable sans garder le verrou"""
+        with self.lock:
+            return list(self.sessions.values())
+
+    def clear(self):
+        with self.lock:
+            clients = list(self.sessions.values())
+            self.sessions.clear()
+        return clients
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, client):
+        return self.sessions.get(client.id) is client
+
+
+class Room:
+    """Salle de visionnage : vidéo, état de référence, membres et hôte
+
+    Chaque salle a son propre verrou : les commandes d'une salle ne bloquent pas les autres.
+    """
+
+    def __init__(self, room_id, sync_threshold=1.0):
+        self.id = room_id
+        self.epoch = uuid.uuid4().hex[:8]  # Identifie cette salle : une salle recréée repart de la version zéro
+        self.members = {}  # {id: ClientConnection}
+        self.empty_since = time.time()  # Instant depuis lequel la salle est vide (None si occupée)
+        self.current_video_url = None
+        self.url_seq = 0  # Version à laquelle l'URL a changé pour la dernière fois
+        self.current_video_state = {"playing": False, "time": 0.0, "rate": 1.0}
+        self.state_timestamp = time.time()  # Instant auquel current_video_state["time"] a été mesuré
+        self.state_seq = 0  # Version de l'état de la salle, incrémentée à chaque changement
+        # Dernières versions (url, lecture, vitesse) pour n'envoyer aux clients qui reviennent que ce qui a changé
+        self.state_history = {}
+        self.state_history_size = 256
+        self.lock = threading.RLock()
+        self.host_id = None  # Identifiant de connexion du client hôte
+        # Position de l'hôte : l'état extrapolé suffit tant que son dernier relevé est récent
+        self.host_report_at = None  # Instant (horloge serveur) du dernier relevé de position de l'hôte
+        self.host_request_at = None
+        self.pending_host_requesters = set()  # Clients en attente de la réponse de l'hôte
+        self.sync_threshold = sync_threshold  # Seuil de désynchronisation en secondes
+
+    def add_member(self, client):
+        with self.lock:
+            self.members[client.id] = client
+            self.empty_since = None
+
+    def remove_member(self, client):
+        """Retire un membre (et l'hôte s'il s'agit de lui), renvoie True si la salle est désormais vide"""
+        with self.lock:
+            if self.members.get(client.id) is client:
+                del self.members[client.id]
+            if client.id == self.host_id:
+                self.host_id = None
+            if not self.members and self.empty_since is None:
+                self.empty_since = time.time()
+            return not self.members
+
+    def get_member(self, client_id):
+        return self.members.get(client_id)
+
+    def claim_host(self, client):
+        """Désigne client comme hôte si la salle n'a pas d'hôte encore connecté, renvoie True s'il l'est"""
+        with self.lock:
+            if self.host_id is not None and self.host_id != client.id and self.host_id in self.members:
+                return False
+            self.host_id = client.id
+            return True
+
+    def snapshot(self):
+        """Copie de la liste des membres, parcourable sans garder le verrou"""
+        with self.lock:
+            return list(self.members.values())
+
+    def extrapolate_position(self, now=None):
+        """Position de référence estimée à l'instant now (temps écoulé ajouté si la vidéo est en lecture)"""
+        if now is None:
+            now = time.time()
+        state = self.current_video_state
+        if state["playing"]:
+            return state["time"] + (now - self.state_timestamp) * state["rate"]
+        return state["time"]
+
+    def update_video_state(self, time_pos=None, playing=None, measured_at=None, rate=None):
+        """Met à jour l'état de référence ; sans position, celle-ci est extrapolée à l'instant présent
+
+        measured_at indique l'instant (horloge serveur) où la position a été relevée.
+        """
+        now = time.time()
+        if measured_at is None or time_pos is None:
+            measured_at = now
+        with self.lock:
+            if time_pos is None:
+                time_pos = self.extrapolate_position(now)
+            self.current_video_state["time"] = time_pos
+            if playing is not None:
+                self.current_video_state["playing"] = playing
+            if rate is not None:
+                self.current_video_state["rate"] = rate
+            self.state_timestamp = measured_at
+
+    def video_state_snapshot(self, now=None):
+        """Copie de l'état de référence avec la position extrapolée à l'instant now"""
+        with self.lock:
+            return {
+                "playing": self.current_video_state["playing"],
+                "time": self.extrapolate_position(now),
+                "rate": self.current_video_state["rate"]
+            }
+
+    def commit_state(self, time_pos=None, playing=None, measured_at=None, rate=None, url=None):
+        """Modifie l'état de la salle et renvoie le message state de la nouvelle version
+
+        Modification et numérotation se font sous le même verrou : si deux commandes se
+        croisent, la plus récente porte le numéro le plus grand et les clients ignorent l'autre.
+        """
+        with self.lock:
+            self.update_video_state(time_pos, playing, measured_at, rate)
+            self.state_seq += 1
+            if url is not None:
+                self.current_video_url = url
+                self.url_seq = self.state_seq
+            self.state_history[self.state_seq] = self.state_fields()
+            if len(self.state_history) > self.state_history_size:
+                del self.state_history[next(iter(self.state_history))]
+            # L'URL n'est diffusée que par la version qui la change : les autres états
+            # (lecture, pause, seek...) tiennent alors dans le format binaire
+            return self.state_message(include_url=False)
+
+    def state_fields(self):
+        """Champs de l'état qui ne dépendent pas du temps (comparés pour les états différentiels)"""
+        return {
+            "url": self.current_video_url,
+            "playing": self.current_video_state["playing"],
+            "rate": self.current_video_state["rate"]
+        }
+
+    def state_message(self, now=None, include_url=True):
+        """Message state : version, vidéo et état de référence extrapolé à l'instant now
+
+        url_seq indique la version qui a défini l'URL. Avec include_url=False, l'URL n'est
+        jointe que si elle vient de changer : un client qui a manqué ce changement le
+        détecte grâce à url_seq et redemande l'état.
+        """
+        if now is None:
+            now = time.time()
+        with self.lock:
+            message = self.video_state_snapshot(now)
+            message.update(type="state", seq=self.state_seq, url_seq=self.url_seq, sent_at=now)
+            if include_url or self.url_seq == self.state_seq:
+                message["url"] = self.current_video_url
+            return message
+
+    def state_delta(self, last_seq, epoch=None, now=None):
+        """Message state ne contenant que ce qui a changé depuis la version last_seq du client
+
+        La position est toujours incluse (elle avance avec le temps). Si la version du client
+        est inconnue (autre salle ou instance du serveur, version trop ancienne), l'état complet est envoyé.
+        """
+        with self.lock:
+            message = self.state_message(now)
+            base = self.state_history.get(last_seq) if epoch == self.epoch else None
+            if base is None:
+                return message
+
+            for key, value in base.items():
+                if message[key] == value:
+                    del message[key]
+            message["base_seq"] = last_seq
+            return message
+
+    def host_report_fresh(self, max_age, now=None):
+        """Indique si le dernier relevé de position de l'hôte date de moins de max_age secondes"""
+        if now is None:
+            now = time.time()
+        return self.host_report_at is not None and now - self.host_report_at <= max_age
+
 
 class Server:
-    """Classe représentant le serveur de synchronisation des vidéos"""
+    """Classe représentant le serveur de synchronisation des vidéos
+
+    Un même serveur héberge plusieurs salles indépendantes (Room) : chaque client rejoint
+    une salle (message join_room, DEFAULT_ROOM à défaut) et ne reçoit que ses diffusions.
+    """
     
     def __init__(self, host='0.0.0.0', port=PORT):
         self.host = host
         self.port = port
         self.server_socket = None
-        self.clients = []
+        self.clients = ClientRegistry()
         self.running = False
-        self.current_video_url = None
-        self.current_video_state = {"playing": False, "time": 0.0}
-        self.lock = threading.Lock()
-        # Nouveau: pour suivre le temps de lecture de chaque client
-        self.client_positions = {}  # {client_addr: {"time": seconds, "timestamp": server_time}}
-        self.host_client = None  # Référence au socket du client hôte
-        self.sync_threshold = 1.0  # Seuil de désynchronisation en secondes
+        self.rooms = {}  # {identifiant de salle: Room}
+        self.rooms_lock = threading.Lock()  # Ne protège que la création / suppression des salles
+        self.empty_room_ttl = 300.0  # Une salle vide est conservée N secondes (reconnexions)
+        self.max_room_id_length = 64
+        self.sync_threshold = 1.0  # Seuil de désynchronisation par défaut des nouvelles salles (secondes)
+        self.host_report_max_age = 6.0  # Au-delà (secondes), l'hôte est interrogé directement
+        self.host_request_timeout = 2.0  # Délai avant de renvoyer une demande restée sans réponse
+        self.codecs = [BINARY_CODEC]  # Codecs proposés aux clients dans le message welcome
+        # Politique d'envoi vers les clients lents
+        self.outbound_queue_size = 1024  # Nombre maximal de messages en attente par client
+        self.slow_client_timeout = 10.0  # Déconnexion si l'envoi est bloqué depuis plus de N secondes
+        self.droppable_messages = {"auto_sync", "pong"}  # Messages abandonnés en premier quand la file est pleine
+        # Messages qui remplacent, dans la file d'un client, ceux pas encore envoyés :
+        # un client en retard ne reçoit que le dernier état, pas toutes les commandes intermédiaires
+        self.superseded_messages = {
+            "state": {"state", "auto_sync"},
+            "auto_sync": {"auto_sync"}
+        }
         
     def start(self):
         """Démarre le serveur"""
@@ -51,20 +453,11 @@ class Server:
             try:
                 client_socket, addr = self.server_socket.accept()
                 logger.info(f"Nouvelle connexion de {addr[0]}:{addr[1]}")
-                
-                with self.lock:
-                    self.clients.append(client_socket)
-                
-                # Si une vidéo est déjà en cours, envoyer les infos au nouveau client
-                if self.current_video_url:
-                    self.send_to_client(client_socket, {
-                        "type": "video_info",
-                        "url": self.current_video_url,
-                        "state": self.current_video_state
-                    })
+                client = SocketConnection(client_socket, addr, self)
+                self.register_client(client)
                 
                 # Démarrer un thread pour gérer ce client
-                client_thread = threading.Thread(target=self.handle_client, args=(client_socket, addr))
+                client_thread = threading.Thread(target=self.handle_client, args=(client, addr))
                 client_thread.daemon = True
                 client_thread.start()
                 
@@ -72,193 +465,348 @@ class Server:
                 if self.running:  # Ignorer les erreurs lors de l'arrêt du serveur
                     logger.error(f"Erreur lors de l'acceptation d'une connexion: {e}")
                     
-    def handle_client(self, client_socket, addr):
+    def handle_client(self, client, addr):
         """Gère les messages d'un client spécifique"""
+        decoder = FrameDecoder()
         while self.running:
             try:
-                data = client_socket.recv(BUFFER_SIZE)
+                data = client.recv(BUFFER_SIZE)
                 if not data:
                     break
-                    
-                message = json.loads(data.decode('utf-8'))
-                logger.info(f"Message reçu de {addr[0]}:{addr[1]}: {message}")
-                
-                self.process_message(message, client_socket)
                 
-            except json.JSONDecodeError:
-                logger.error(f"Message mal formaté reçu de {addr[0]}:{addr[1]}")
+                # Un même paquet peut contenir plusieurs messages (ou un message partiel)
+                self.handle_payloads(decoder.feed(data), client, addr)
+
+            except ProtocolError as e:
+                logger.error(f"Flux invalide reçu de {addr[0]}:{addr[1]}: {e}")
+                break
             except Exception as e:
-                logger.error(f"Erreur lors du traitement d'un message client: {e}")
+                if not client.closed:  # Connexion fermée par le serveur (client trop lent) : rien à signaler
+                    logger.error(f"Erreur lors du traitement d'un message client: {e}")
                 break
                 
         # Client déconnecté
-        with self.lock:
-            if client_socket in self.clients:
-                self.clients.remove(client_socket)
-        try:
-            client_socket.close()
-        except:
-            pass
-        logger.info(f"Client {addr[0]}:{addr[1]} déconnecté")
-    
-    def check_sync_status(self, client_addr, position):
-        """Vérifie si un client est désynchronisé et envoie une correction si nécessaire"""
-        with self.lock:
-            # Stocker la position du client avec un horodatage
-            self.client_positions[client_addr] = {
-                "time": position,
-                "timestamp": time.time()
-            }
-            
-            # Si c'est l'hôte, mettre à jour l'état courant
-            if self.host_client and tuple(client_addr) == self.host_client.getpeername():
-                self.current_video_state["time"] = position
-                
-                # Vérifier la synchronisation de tous les clients
-                current_host_position = position
-                clients_to_sync = []
-                
-                for client_socket in self.clients:
-                    try:
-                        client_addr_tuple = client_socket.getpeername()
-                        # Ne pas vérifier l'hôte lui-même
-                        if client_socket == self.host_client:
-                            continue
-                            
-                        # Récupérer la position du client s'il existe
-                        client_data = self.client_positions.get(client_addr_tuple)
-                        if client_data:
-                            client_position = client_data["time"]
-                            time_diff = abs(current_host_position - client_position)
-                            
-                            # Si le décalage est supérieur au seuil, ajouter à la liste à synchroniser
-                            if time_diff > self.sync_threshold:
-                                clients_to_sync.append(client_socket)
-                    except:
-                        continue
+        self.unregister_client(client)
+
+    def register_client(self, client):
+        """Enregistre une nouvelle connexion et lui envoie son identifiant et l'état courant"""
+        self.clients.add(client)
+        # L'état de la salle est envoyé en réponse à la demande de synchronisation du client,
+        # qui indique la dernière version qu'il connaît (état complet ou différentiel)
+        # Les codecs proposés permettent au client de passer au binaire (message hello)
+        self.send_to_client(client, {"type": "welcome", "id": client.id, "codecs": self.codecs})
+
+    def unregister_client(self, client):
+        """Retire une connexion du registre (et de sa salle) et la ferme"""
+        self.clients.remove(client)
+        self.leave_room(client)
+        client.close()
+        logger.info(f"Client {client.addr[0]}:{client.addr[1]} déconnecté")
+
+    def handle_payloads(self, payloads, client, addr):
+        """Décode et traite les messages complets reçus d'un client"""
+        for payload in payloads:
+            if client.closed:
+                break  # Connexion fermée par le serveur (client trop lent) : messages restants ignorés
                 
-                # Envoyer des commandes de synchronisation aux clients désynchronisés
-                for client_socket in clients_to_sync:
-                    try:
-                        self.send_to_client(client_socket, {
-                            "type": "auto_sync",
-                            "time": current_host_position
-                        })
-                        logger.info(f"Correction automatique envoyée au client {client_socket.getpeername()}")
-                    except:
-                        pass
+            try:
+                message = decode_payload(payload)
+            except ValueError:  # JSON, UTF-8 ou message binaire invalide
+                logger.error(f"Message mal formaté reçu de {addr[0]}:{addr[1]}")
+                continue
+
+            # Chemin emprunté par chaque message : formatage différé, seulement en mode debug
+            logger.debug("Message reçu de %s:%s: %s", addr[0], addr[1], message)
+            self.process_message(message, client)
+
+    def get_room(self, room_id=DEFAULT_ROOM):
+        """Renvoie une salle existante, ou la crée"""
+        with self.rooms_lock:
+            return self.find_or_create_room(room_id)
+
+    def find_or_create_room(self, room_id):
+        """Renvoie la salle room_id, créée au besoin (appelé sous rooms_lock)"""
+        room = self.rooms.get(room_id)
+        if room is None:
+            self.remove_idle_rooms()
+            room = Room(room_id, self.sync_threshold)
+            self.rooms[room_id] = room
+            logger.info(f"Salle '{room_id}' créée")
+        return room
+
+    def remove_idle_rooms(self, now=None):
+        """Supprime les salles vides depuis plus de empty_room_ttl secondes (appelé sous rooms_lock)"""
+        if now is None:
+            now = time.time()
+        for room_id, room in list(self.rooms.items()):
+            if room.empty_since is not None and now - room.empty_since > self.empty_room_ttl:
+                del self.rooms[room_id]
+                logger.info(f"Salle '{room_id}' supprimée (vide)")
+
+    def join_room(self, client, room_id=None):
+        """Place un client dans une salle (en quittant la précédente) et lui confirme son entrée"""
+        room_id = str(room_id or DEFAULT_ROOM)[:self.max_room_id_length]
+        if client.room is not None and client.room.id != room_id:
+            self.leave_room(client)
+            
+        with self.rooms_lock:
+            room = self.find_or_create_room(room_id)
+            room.add_member(client)
+        client.room = room
+        
+        # L'époque de la salle permet au client de savoir si ses numéros de version sont encore valables
+        self.send_to_client(client, {"type": "room_joined", "room": room.id, "epoch": room.epoch})
+        return room
+
+    def leave_room(self, client):
+        """Retire un client de sa salle"""
+        room = client.room
+        client.room = None
+        client.role = "viewer"  # Le rôle d'hôte est propre à la salle
+        if room is not None:
+            room.remove_member(client)
+
+    def room_of(self, client):
+        """Salle d'un client ; un client qui n'en a rejoint aucune est placé dans la salle par défaut"""
+        if client is None:
+            return self.get_room(DEFAULT_ROOM)
+        return client.room or self.join_room(client)
+
+    def set_sync_threshold(self, threshold):
+        """Modifie le seuil de désynchronisation de toutes les salles (et des prochaines)"""
+        self.sync_threshold = threshold
+        with self.rooms_lock:
+            rooms = list(self.rooms.values())
+        for room in rooms:
+            room.sync_threshold = threshold
+
+    def request_host_time(self, room, requester):
+        """Demande sa position à l'hôte de la salle seul ; les demandes simultanées partagent la même réponse"""
+        host = room.get_member(room.host_id) if room.host_id is not None else None
+        if host is None:
+            return False  # Pas d'hôte identifié : l'état extrapolé est la meilleure référence
+            
+        now = time.time()
+        with room.lock:
+            room.pending_host_requesters.add(requester.id)
+            if room.host_request_at is not None and now - room.host_request_at < self.host_request_timeout:
+                return True  # Une demande est déjà en cours
+            room.host_request_at = now
+            
+        self.send_to_client(host, {"type": "host_time_request", "requester": requester.id})
+        return True
+
+    def convert_state_fields(self, message):
+        """Convertit les champs d'état venus du réseau (time, rate, sent_at, playing)
+
+        Ces valeurs alimentent l'état de la salle et ses calculs d'extrapolation : une valeur
+        invalide (texte, infini...) lève ValueError ou TypeError au lieu d'y être stockée.
+        """
+        for key in ("time", "rate", "sent_at"):
+            if message.get(key) is not None:
+                value = float(message[key])
+                if not math.isfinite(value):
+                    raise ValueError(f"valeur non finie pour {key}")
+                message[key] = value
+        if message.get("playing") is not None:
+            message["playing"] = bool(message["playing"])
+        return message
+
+    def measured_at(self, message, client=None):
+        """Instant (horloge serveur) auquel la position portée par un message a été relevée
+
+        Les clients horodatent leurs messages dans l'horloge du serveur (champ sent_at) ;
+        à défaut, on retire la moitié du RTT connu de la connexion.
+        """
+        now = time.time()
+        sent_at = message.get("sent_at")
+        if sent_at is not None:
+            return min(sent_at, now)
+        if client is not None and client.rtt:
+            return now - client.rtt / 2
+        return now
+
+    def check_sync_status(self, client, position, playing=False, measured_at=None):
+        """Vérifie si un client est désynchronisé et envoie une correction si nécessaire
+
+        Chaque rapport est comparé à la position de l'hôte de sa salle, extrapolée depuis
+        son dernier rapport : seul le client concerné est évalué (O(1) par rapport).
+        """
+        room = self.room_of(client)
+        now = time.time()
+        if measured_at is None:
+            measured_at = now
+        # Stocker la position du client avec un horodatage
+        client.position = {
+            "time": position,
+            "timestamp": measured_at
+        }
+        
+        # Si c'est l'hôte, son rapport devient la nouvelle référence
+        if client.id == room.host_id:
+            room.update_video_state(position, playing, measured_at)
+            room.host_report_at = measured_at
+            return
+            
+        # Sans hôte identifié, pas de référence fiable
+        if room.host_id is None:
+            return
+            
+        # Comparer les deux positions au même instant (celui de la mesure du client)
+        with room.lock:
+            host_position = room.extrapolate_position(measured_at)
+            reference_playing = room.current_video_state["playing"]
+            
+        # Si le décalage est supérieur au seuil, envoyer une correction à ce client uniquement
+        if abs(position - host_position) > room.sync_threshold:
+            try:
+                self.send_to_client(client, {
+                    "type": "auto_sync",
+                    "time": room.extrapolate_position(now),
+                    "playing": reference_playing,
+                    "sent_at": now
+                })
+                logger.info(f"Correction automatique envoyée au client {client.id}")
+            except:
+                pass
         
     def process_message(self, message, sender_socket=None):
-        """Traite un message reçu d'un client"""
+        """Traite un message reçu d'un client (dans le contexte de sa salle)"""
         msg_type = message.get("type")
         
-        if msg_type == "set_video":
-            self.current_video_url = message.get("url")
-            self.current_video_state = {"playing": False, "time": 0.0}
+        if msg_type == "join_room":
+            # Poignée de main : le client choisit sa salle avant de demander l'état
+            if sender_socket:
+                self.join_room(sender_socket, message.get("room"))
+            return
+            
+        if msg_type == "hello":
+            # Le client choisit l'un des codecs proposés : les messages fréquents qu'on lui
+            # envoie sont désormais encodés ainsi (il décode toujours aussi le JSON)
+            codec = message.get("codec")
+            if sender_socket and codec in self.codecs:
+                sender_socket.codec = codec
+            return
+            
+        if msg_type == "ping":
+            # Échange d'horloge : renvoyer les instants de réception et d'envoi du serveur
+            received_at = time.time()
+            if sender_socket:
+                # Le client communique son estimation lissée (RTT et décalage)
+                if message.get("rtt") is not None:
+                    try:
+                        sender_socket.rtt = float(message.get("rtt"))
+                        offset = message.get("offset")
+                        sender_socket.clock_offset = float(offset) if offset is not None else None
+                    except (ValueError, TypeError):
+                        pass
+                try:
+                    self.send_to_client(sender_socket, {
+                        "type": "pong",
+                        "t0": message.get("t0"),
+                        "t1": received_at,
+                        "t2": time.time()
+                    })
+                except:
+                    pass
+            return
+            
+        try:
+            self.convert_state_fields(message)
+        except (ValueError, TypeError) as e:
+            logger.warning(f"Message {msg_type} ignoré, champ invalide: {e}")
+            return
             
-            # Diffuser à tous les clients
-            self.broadcast({
-                "type": "video_info",
-                "url": self.current_video_url,
-                "state": self.current_video_state
-            })
+        # Les messages suivants concernent la salle (rejointe d'office par un client sans join_room)
+        room = self.room_of(sender_socket)
+        
+        if msg_type == "set_video":
+            # Nouvelle vidéo : position 0, en pause, vitesse normale
+            self.broadcast(room.commit_state(0.0, False, rate=1.0, url=message.get("url")), room)
             
         elif msg_type == "play":
-            self.current_video_state["playing"] = True
-            self.broadcast({"type": "play"})
+            self.broadcast(room.commit_state(playing=True), room)
             
         elif msg_type == "pause":
-            self.current_video_state["playing"] = False
-            self.broadcast({"type": "pause"})
+            self.broadcast(room.commit_state(playing=False), room)
             
         elif msg_type == "seek":
             time_pos = message.get("time", 0)
-            self.current_video_state["time"] = time_pos
-            self.broadcast({
-                "type": "seek",
-                "time": time_pos
-            })
+            self.broadcast(room.commit_state(time_pos, measured_at=self.measured_at(message, sender_socket)), room)
+            
+        elif msg_type == "rate":
+            # Changement de vitesse de lecture pour toute la salle
+            self.broadcast(room.commit_state(rate=message.get("rate", 1.0)), room)
+            
+        elif msg_type == "state_update":
+            # Plusieurs commandes de l'hôte fusionnées en un seul état (champs absents = inchangés)
+            time_pos = message.get("time")
+            measured_at = self.measured_at(message, sender_socket) if time_pos is not None else None
+            self.broadcast(room.commit_state(time_pos, message.get("playing"), measured_at, message.get("rate")), room)
             
         elif msg_type == "sync_request":
             # Un client demande une synchronisation
-            if sender_socket and self.current_video_url:
-                # Avant d'envoyer l'état, on demande à l'hôte son état actuel
-                # Pour cela, on diffuse une demande spéciale à l'hôte
+            if sender_socket and room.current_video_url:
+                # L'état de référence est extrapolé (et recalé par les rapports de l'hôte) :
+                # on répond directement avec ce qui a changé depuis la version connue du client
                 try:
-                    requester_addr = sender_socket.getpeername()
-                    self.broadcast({
-                        "type": "host_time_request",
-                        "requester": requester_addr  # Identifie le client qui a fait la demande
-                    })
+                    self.send_to_client(sender_socket, room.state_delta(message.get("last_seq"),
+                                                                        message.get("epoch")))
                     
-                    # On envoie quand même l'état actuel (qui pourrait être un peu décalé)
-                    # mais c'est mieux que rien en attendant la réponse de l'hôte
-                    self.send_to_client(sender_socket, {
-                        "type": "video_info",
-                        "url": self.current_video_url,
-                        "state": self.current_video_state
-                    })
+                    # Dernier relevé de l'hôte trop ancien : lui demander (à lui seul) sa position
+                    if not room.host_report_fresh(self.host_report_max_age):
+                        self.request_host_time(room, sender_socket)
                 except Exception as e:
                     logger.error(f"Erreur lors de la synchronisation: {e}")
                 
         elif msg_type == "host_time_response":
-            # L'hôte répond avec son temps actuel
+            # L'hôte répond avec son temps actuel (seul l'hôte de la salle est interrogé)
+            if sender_socket is None or sender_socket.id != room.host_id:
+                logger.info(f"Réponse de position ignorée : le client n'est pas l'hôte de la salle '{room.id}'")
+                return
+                
             current_time = message.get("time", 0)
             playing = message.get("playing", False)
-            requester_addr = message.get("requester", None)
+            measured_at = self.measured_at(message, sender_socket)
             
-            # Mettre à jour l'état stocké
-            self.current_video_state["time"] = current_time
-            self.current_video_state["playing"] = playing
+            # Mettre à jour l'état stocké (nouvelle version, envoyée aux demandeurs uniquement)
+            state = room.commit_state(current_time, playing, measured_at)
+            with room.lock:
+                room.host_report_at = measured_at
+                requesters = room.pending_host_requesters
+                room.pending_host_requesters = set()
+                room.host_request_at = None
+            requesters.add(message.get("requester"))
             
-            # Si un client spécifique a fait la demande, on lui envoie la mise à jour
-            if requester_addr:
-                for client in self.clients:
+            # Envoyer la mise à jour à chaque client qui l'a demandée (un seul message)
+            for requester_id in requesters:
+                requester = room.get_member(requester_id)
+                if requester:
                     try:
-                        if client.getpeername() == tuple(requester_addr):
-                            self.send_to_client(client, {
-                                "type": "seek",
-                                "time": current_time
-                            })
-                            if playing:
-                                self.send_to_client(client, {"type": "play"})
-                            else:
-                                self.send_to_client(client, {"type": "pause"})
-                            break
+                        self.send_to_client(requester, state)
                     except:
-                        continue
+                        pass
                 
         elif msg_type == "force_sync":
             # L'hôte demande une synchronisation forcée pour tous les clients
             current_time = message.get("time", 0)
             playing = message.get("playing", False)
             
-            # Mettre à jour l'état actuel de la vidéo
-            self.current_video_state["time"] = current_time
-            self.current_video_state["playing"] = playing
-            
-            # Diffuser à tous les clients
-            self.broadcast({
-                "type": "seek",
-                "time": current_time
-            })
-            
-            # Diffuser l'état de lecture (play/pause)
-            if playing:
-                self.broadcast({"type": "play"})
-            else:
-                self.broadcast({"type": "pause"})
+            # Mettre à jour l'état actuel de la vidéo et le diffuser en un seul message
+            self.broadcast(room.commit_state(current_time, playing, self.measured_at(message, sender_socket)), room)
                 
         elif msg_type == "chat":
             # Message de chat à diffuser
             username = message.get("username", "Anonyme")
             content = message.get("content", "")
+            if sender_socket:
+                sender_socket.username = username
             if content.strip():
                 self.broadcast({
                     "type": "chat",
                     "username": username,
                     "content": content
-                })
+                }, room)
                 
         elif msg_type == "report_position":
             # Un client envoie sa position actuelle
@@ -267,38 +815,56 @@ class Server:
             
             try:
                 if sender_socket:
-                    client_addr = sender_socket.getpeername()
+                    # Si c'est l'hôte qui envoie sa position, identifier cette connexion comme l'hôte
+                    # (un second client qui se déclare hôte ne remplace pas l'hôte encore connecté)
+                    if message.get("is_host", False) and sender_socket.role != "host":
+                        if room.claim_host(sender_socket):
+                            sender_socket.role = "host"
+                        else:
+                            logger.info(f"Client {sender_socket.id} se déclare hôte, mais la salle '{room.id}' a déjà un hôte")
+                        
                     # Enregistrer la position du client et vérifier la synchronisation
-                    self.check_sync_status(client_addr, position)
-                    
-                    # Si c'est l'hôte qui envoie sa position, identifier ce socket comme l'hôte
-                    if message.get("is_host", False):
-                        self.host_client = sender_socket
-                        # Mettre à jour l'état de lecture
-                        self.current_video_state["playing"] = is_playing
+                    self.check_sync_status(sender_socket, position, is_playing,
+                                           self.measured_at(message, sender_socket))
             except Exception as e:
                 logger.error(f"Erreur lors du traitement d'un rapport de position: {e}")
-    
-    def broadcast(self, message):
-        """Envoie un message à tous les clients connectés"""
-        with self.lock:
-            disconnected_clients = []
-            for client in self.clients:
-                try:
-                    self.send_to_client(client, message)
-                except:
-                    disconnected_clients.append(client)
-                    
-            # Nettoyer les clients déconnectés
-            for client in disconnected_clients:
-                if client in self.clients:
-                    self.clients.remove(client)
+
+    def broadcast(self, message, room=None):
+        """Met un message en file d'envoi pour les membres d'une salle (tous les clients par défaut)
+
+        L'envoi n'est pas attendu : chaque connexion a sa propre file.
+        """
+        # Sérialiser une seule fois par codec : la même trame (immuable) est partagée par les files
+        frames = {}
+        msg_type = message.get("type")
+        version = self.message_version(message, room)
+        
+        disconnected_clients = []
+        recipients = room.snapshot() if room is not None else self.clients.snapshot()
+        for client in recipients:
+            data = frames.get(client.codec)
+            if data is None:
+                data = frames[client.codec] = memoryview(encode_message(message, client.codec))
+            if not client.send(data, msg_type, version):
+                disconnected_clients.append(client)
+                
+        # Nettoyer les clients déconnectés
+        for client in disconnected_clients:
+            self.clients.remove(client)
+            self.leave_room(client)
                     
-    def send_to_client(self, client_socket, message):
-        """Envoie un message à un client spécifique"""
+    def message_version(self, message, room):
+        """Version (instance de la salle, seq) d'un message state, None pour les autres messages"""
+        if room is None or message.get("type") != "state":
+            return None
+        return (room.epoch, message.get("seq", 0))
+        
+    def send_to_client(self, client, message):
+        """Met un message en file d'envoi pour un client spécifique"""
         try:
-            data = json.dumps(message).encode('utf-8')
-            client_socket.sendall(data)
+            data = encode_message(message, client.codec)
+            if not client.send(data, message.get("type"), self.message_version(message, client.room)):
+                raise ConnectionError(f"Client {client.addr[0]}:{client.addr[1]} déconnecté")
         except Exception as e:
             logger.error(f"Erreur lors de l'envoi d'un message à un client: {e}")
             raise
@@ -308,13 +874,11 @@ class Server:
         self.running = False
         
         # Fermer toutes les connexions client
-        with self.lock:
-            for client in self.clients:
-                try:
-                    client.close()
-                except:
-                    pass
-            self.clients = []
+        for client in self.clients.clear():
+            try:
+                client.close()
+            except:
+                pass
             
         # Fermer le socket serveur
         if self.server_socket:
@@ -323,4 +887,216 @@ class Server:
             except:
                 pass
             
-        logger.info("Serveur arrêté")
\ No newline at end of file
+        logger.info("Serveur arrêté")
+
+
+class StreamConnection(ClientConnection):
+    """Connexion d'un client sur un flux asyncio, vidée par une tâche écrivaine"""
+
+    def __init__(self, writer, server, loop):
+        super().__init__(writer.get_extra_info('peername'), server)
+        self.writer = writer
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.ready = asyncio.Event()
+        self.writer_task = loop.create_task(self.write_loop())
+
+    def in_loop(self):
+        return threading.get_ident() == self.loop_thread_id
+
+    def wake_writer(self):
+        # Réveil direct depuis la boucle, sinon passage par call_soon_threadsafe
+        if self.in_loop():
+            self.ready.set()
+        else:
+            self.loop.call_soon_threadsafe(self.ready.set)
+
+    async def write_loop(self):
+        """Envoie les messages en file jusqu'à la fermeture de la connexion"""
+        try:
+            while True:
+                await self.ready.wait()
+                self.ready.clear()
+
+                batch = self.take_batch()
+                if batch is None:
+                    break
+
+                for data in batch:
+                    self.writer.write(data)
+                # Attendre que le tampon du transport se vide (un client lent n'affecte que sa tâche)
+                await self.writer.drain()
+                self.mark_sent()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if not self.closed:
+                logger.error(f"Erreur lors de l'envoi d'un message à un client: {e}")
+            self.close()
+
+    def close_transport(self):
+        if self.in_loop():
+            self.writer.close()
+        else:
+            self.loop.call_soon_threadsafe(self.writer.close)
+
+
+class AsyncServer(Server):
+    """Serveur de synchronisation basé sur asyncio
+
+    Toutes les connexions sont gérées par une seule boucle d'événements (dans un thread
+    dédié) au lieu d'un thread par client. Le traitement des messages est celui de Server.
+    """
+
+    def __init__(self, host='0.0.0.0', port=PORT):
+        super().__init__(host, port)
+        self.loop = None
+        self.async_server = None
+        self.loop_thread = None
+
+    def start(self):
+        """Démarre la boucle d'événements et attend que le serveur écoute"""
+        started = threading.Event()
+        self.loop_thread = threading.Thread(target=self.run_loop, args=(started,))
+        self.loop_thread.daemon = True
+        self.loop_thread.start()
+
+        started.wait(5)
+        return self.running
+
+    def run_loop(self, started=None):
+        """Exécute la boucle d'événements du serveur jusqu'à son arrêt"""
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.async_server = self.loop.run_until_complete(asyncio.start_server(
+                self.handle_connection, self.host, self.port, reuse_address=True, backlog=1024
+            ))
+            self.running = True
+            logger.info(f"Serveur asyncio démarré sur {self.host}:{self.port}")
+        except Exception as e:
+            logger.error(f"Erreur lors du démarrage du serveur: {e}")
+            self.loop.close()
+            return
+        finally:
+            if started:
+                started.set()
+
+        try:
+            self.loop.run_forever()
+        finally:
+            # Annuler les connexions encore ouvertes avant de fermer la boucle
+            pending = asyncio.all_tasks(self.loop)
+            for task in pending:
+                task.cancel()
+            self.loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+            self.loop.close()
+
+    async def handle_connection(self, reader, writer):
+        """Gère les messages d'un client (équivalent asynchrone de handle_client)"""
+        client = StreamConnection(writer, self, self.loop)
+        addr = client.getpeername()
+        logger.info(f"Nouvelle connexion de {addr[0]}:{addr[1]}")
+
+        self.register_client(client)
+
+        decoder = FrameDecoder()
+        try:
+            while self.running:
+                data = await reader.read(BUFFER_SIZE)
+                if not data:
+                    break
+
+                self.handle_payloads(decoder.feed(data), client, addr)
+
+        except ProtocolError as e:
+            logger.error(f"Flux invalide reçu de {addr[0]}:{addr[1]}: {e}")
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            if not client.closed:  # Connexion fermée par le serveur (client trop lent) : rien à signaler
+                logger.error(f"Erreur lors du traitement d'un message client: {e}")
+
+        # Client déconnecté
+        self.unregister_client(client)
+        client.writer_task.cancel()
+
+    def shutdown(self):
+        """Ferme le serveur et les connexions (exécuté dans la boucle d'événements)"""
+        if self.async_server:
+            self.async_server.close()
+
+        for client in self.clients.clear():
+            try:
+                client.close()
+            except:
+                pass
+
+        self.loop.stop()
+
+    def stop(self):
+        """Arrête le serveur"""
+        self.running = False
+
+        if self.loop and self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.shutdown)
+            if self.loop_thread and self.loop_thread is not threading.current_thread():
+                self.loop_thread.join(5)
+
+        logger.info("Serveur arrêté")
+
+
+def parse_server_args(argv=None):
+    """Lit la configuration du serveur dédié (options, à défaut variables d'environnement)"""
+    parser = argparse.ArgumentParser(
+        prog="python -m server",
+        description="Watch Party - serveur de synchronisation dédié (sans interface ni navigateur)"
+    )
+    parser.add_argument("--host", default=os.environ.get("WATCHPARTY_HOST", "0.0.0.0"),
+                        help="Adresse d'écoute (WATCHPARTY_HOST, défaut: 0.0.0.0)")
+    parser.add_argument("--port", type=int, default=os.environ.get("WATCHPARTY_PORT", str(PORT)),
+                        help=f"Port d'écoute (WATCHPARTY_PORT, défaut: {PORT})")
+    parser.add_argument("--threaded", action="store_true",
+                        default=os.environ.get("WATCHPARTY_THREADED", "0") not in ("", "0"),
+                        help="Un thread par client au lieu du moteur asyncio (WATCHPARTY_THREADED=1)")
+    parser.add_argument("--sync-threshold", type=float,
+                        default=os.environ.get("WATCHPARTY_SYNC_THRESHOLD", "1.0"),
+                        help="Seuil de désynchronisation en secondes (WATCHPARTY_SYNC_THRESHOLD)")
+    parser.add_argument("--empty-room-ttl", type=float,
+                        default=os.environ.get("WATCHPARTY_EMPTY_ROOM_TTL", "300"),
+                        help="Durée de conservation d'une salle vide en secondes (WATCHPARTY_EMPTY_ROOM_TTL)")
+    parser.add_argument("--log-level", default=os.environ.get("WATCHPARTY_LOG_LEVEL", "INFO").upper(),
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="Niveau de journalisation (WATCHPARTY_LOG_LEVEL)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """Exécute un serveur dédié jusqu'à SIGINT / SIGTERM (l'hôte s'y connecte comme un client)"""
+    args = parse_server_args(argv)
+    logging.getLogger().setLevel(args.log_level)
+
+    server_class = Server if args.threaded else AsyncServer
+    server = server_class(host=args.host, port=args.port)
+    server.set_sync_threshold(args.sync_threshold)
+    server.empty_room_ttl = args.empty_room_ttl
+    if not server.start():
+        return 1
+
+    stop_requested = threading.Event()
+
+    def request_stop(signum, frame):
+        logger.info(f"Signal {signal.Signals(signum).name} reçu, arrêt du serveur")
+        stop_requested.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    # Attente par tranches : le thread principal reste réactif aux signaux
+    while not stop_requested.wait(1.0):
+        pass
+
+    server.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
@@ -1,18 +1,136 @@
 # Contrôle de YouTube via Selenium
 
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, WebDriverException
 from urllib.parse import urlparse, parse_qs
 import time
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Agent injecté dans la page : il s'abonne aux événements du lecteur et les met en tampon
+# pour qu'un seul appel execute_script suffise à relever l'état complet
+AGENT_SCRIPT = """
+(function () {
+    if (window.__watchPartyAgent) { return; }
+    var agent = {events: [], maxEvents: 100, player: null, video: null};
+
+    agent.push = function (type, extra) {
+        var v = agent.video;
+        var event = {type: type, time: v ? v.currentTime : null, rate: v ? v.playbackRate : null,
+                     ts: Date.now() / 1000};
+        for (var key in (extra || {})) { event[key] = extra[key]; }
+        agent.events.push(event);
+        if (agent.events.length > agent.maxEvents) { agent.events.shift(); }
+    };
+
+    agent.attach = function () {
+        var p = document.getElementById('movie_player');
+        var v = document.querySelector('#movie_player video');
+        if (p && p !== agent.player && p.addEventListener) {
+            agent.player = p;
+            p.addEventListener('onStateChange', function (state) { agent.push('state', {state: state}); });
+        }
+        if (v && v !== agent.video) {
+            agent.video = v;
+            ['play', 'pause', 'seeked', 'ratechange', 'waiting'].forEach(function (name) {
+                v.addEventListener(name, function () { agent.push(name); });
+            });
+            v.addEventListener('timeupdate', function () { agent.lastUpdate = Date.now() / 1000; });
+        }
+    };
+
+    agent.snapshot = function () {
+        agent.attach();
+        var p = agent.player, v = agent.video;
+        var time = p && p.getCurrentTime ? p.getCurrentTime() : (v ? v.currentTime : 0);
+        var buffered = 0;
+        if (v) {
+            for (var i = 0; i < v.buffered.length; i++) {
+                if (v.buffered.start(i) <= v.currentTime && v.currentTime <= v.buffered.end(i)) {
+                    buffered = v.buffered.end(i) - v.currentTime;
+                }
+            }
+        }
+        return {time: time, state: p && p.getPlayerState ? p.getPlayerState() : -1,
+                rate: v ? v.playbackRate : 1, buffered: buffered, events: agent.events.splice(0)};
+    };
+
+    window.__watchPartyAgent = agent;
+    agent.attach();
+})();
+"""
+
+STATE_SCRIPT = "return window.__watchPartyAgent ? window.__watchPartyAgent.snapshot() : null;"
+
+# Exécution d'une liste de commandes du lecteur en un seul appel (arguments[0] = [[méthode, [args]], ...])
+# La pseudo-méthode "playbackRate" règle directement la vitesse de l'élément <video>,
+# "seekNear" [position, tolérance] ne fait un seek que si l'écart dépasse la tolérance.
+# L'état renvoyé indique en plus, en ms depuis le début du lot, quand le seek a eu lieu
+# (seekAt, null sans seek) et la durée du lot dans la page (batchTime).
+BATCH_SCRIPT = """
+var batchStart = performance.now(), seekAt = null;
+var p = document.getElementById('movie_player');
+var v = document.querySelector('#movie_player video');
+var commands = arguments[0];
+for (var i = 0; i < commands.length; i++) {
+    var name = commands[i][0], args = commands[i][1] || [];
+    if (name === 'playbackRate') {
+        if (v) { v.playbackRate = args[0]; }
+    } else if (name === 'seekNear') {
+        if (Math.abs(p.getCurrentTime() - args[0]) > args[1]) {
+            seekAt = performance.now() - batchStart;
+            p.seekTo(args[0], true);
+        }
+    } else {
+        if (name === 'seekTo') { seekAt = performance.now() - batchStart; }
+        p[name].apply(p, args);
+    }
+}
+var snapshot = window.__watchPartyAgent ? window.__watchPartyAgent.snapshot() : null;
+if (snapshot) {
+    snapshot.seekAt = seekAt;
+    snapshot.batchTime = performance.now() - batchStart;
+}
+return snapshot;
+"""
+
+# Signaux de disponibilité du lecteur, relevés à chaque itération de l'attente de chargement :
+# API du lecteur présente, durée connue, lecteur ni « non démarré » (-1) ni en mémoire tampon (3).
+# Un lecteur non démarré dont la vidéo a déjà assez de données (autoplay bloqué) compte comme prêt,
+# de même qu'une vidéo préparée sans lecture (5, cueVideoById). arguments[0] : ID de vidéo attendu.
+# Le bandeau de consentement aux cookies est accepté au passage s'il bloque la page.
+READY_SCRIPT = """
+var consent = document.querySelector("button[aria-label*='Accept']");
+if (consent) { consent.click(); return null; }
+var p = document.getElementById('movie_player');
+if (!p || !p.getPlayerState || !p.getDuration) { return null; }
+var expected = arguments[0];
+if (expected && p.getVideoData && p.getVideoData().video_id !== expected) { return null; }
+var v = document.querySelector('#movie_player video');
+var state = p.getPlayerState(), duration = p.getDuration();
+if (state === 5) { return {state: state, duration: duration}; }
+if (!(duration > 0) || state === 3) { return null; }
+if (state === -1 && !(v && v.readyState >= 3)) { return null; }
+return {state: state, duration: duration};
+"""
+
+# Acceptation du bandeau de consentement aux cookies s'il est affiché (renvoie true si cliqué)
+CONSENT_SCRIPT = """
+var consent = document.querySelector("button[aria-label*='Accept']");
+if (consent) { consent.click(); return true; }
+return false;
+"""
+
+# Changement de vidéo dans le lecteur déjà ouvert, sans recharger la page YouTube.
+# arguments[0] : ID de la vidéo, arguments[1] : vrai pour la préparer sans la lancer.
+# Renvoie false si aucun lecteur utilisable n'est présent (navigation nécessaire).
+SWITCH_SCRIPT = """
+var p = document.getElementById('movie_player');
+if (location.pathname !== '/watch' || !p || !p.loadVideoById || !p.cueVideoById) { return false; }
+if (arguments[1]) { p.cueVideoById(arguments[0]); } else { p.loadVideoById(arguments[0]); }
+return true;
+"""
+
 class YouTubeController:
     """Classe pour contrôler le navigateur YouTube via Selenium"""
     
@@ -20,9 +138,96 @@ class YouTubeController:
         self.driver = None
         self.is_initialized = False
         self.video_id = None
+        # Coût moyen d'un seek (aller-retour WebDriver), appris au fil des commandes
+        self.seek_latency = 0.0
+        self.seek_latency_alpha = 0.2  # Poids d'une nouvelle mesure dans la moyenne lissée
+        self.seek_samples = 0
+        # Événements du lecteur remontés par l'agent JavaScript
+        self.pending_events = []
+        self.events_lock = threading.Lock()
+        self.max_pending_events = 100
+        # Attente du chargement d'une vidéo : plafond et fréquence de vérification (secondes)
+        self.load_timeout = 10.0
+        self.load_poll_interval = 0.1
+        self.last_load_timings = {}  # Durées du dernier chargement (navigation, lecteur prêt, total)
+        # Préchauffage du navigateur en arrière-plan
+        self.warm_state = "idle"  # "idle", "starting", "ready" ou "failed"
+        self.prewarm_thread = None
+        self.browser_lock = threading.Lock()  # Un seul lancement (et préchargement) de Chrome à la fois
+        # Fermeture demandée pendant le préchauffage : le thread de préchauffage ferme lui-même
+        # le navigateur qu'il lance (sinon Chrome resterait ouvert sans référence)
+        self.warming = False
+        self.close_requested = False
+        self.close_lock = threading.Lock()
+        
+    def prewarm(self, preload=True, headless=False):
+        """Lance le navigateur dans un thread d'arrière-plan (sans effet s'il est déjà lancé)
+
+        Si preload est vrai, la page d'accueil de YouTube est chargée et le bandeau
+        de consentement accepté, pour que la première vidéo s'ouvre plus vite.
+        """
+        if self.is_initialized or (self.prewarm_thread and self.prewarm_thread.is_alive()):
+            return self.prewarm_thread
+            
+        with self.close_lock:
+            self.warming = True
+            self.close_requested = False
+        self.warm_state = "starting"
+        self.prewarm_thread = threading.Thread(target=self.warm_up, args=(preload, headless))
+        self.prewarm_thread.daemon = True
+        self.prewarm_thread.start()
+        return self.prewarm_thread
+        
+    def warm_up(self, preload=True, headless=False):
+        """Lance et prépare le navigateur (exécuté par le thread de préchauffage)"""
+        try:
+            return self.launch_and_preload(preload, headless)
+        finally:
+            with self.close_lock:
+                self.warming = False
+                cancelled = self.close_requested
+                self.close_requested = False
+            if cancelled:
+                self.close()
+                
+    def launch_and_preload(self, preload=True, headless=False):
+        """Lance le navigateur et précharge YouTube (appelé par warm_up)"""
+        with self.browser_lock:
+            if not self.is_initialized and not self.initialize_browser(headless):
+                self.warm_state = "failed"
+                return False
+                
+            if preload:
+                try:
+                    start = time.perf_counter()
+                    self.driver.get("https://www.youtube.com/")
+                    self.driver.execute_script(CONSENT_SCRIPT)
+                    logger.info(f"Page YouTube préchargée en {time.perf_counter() - start:.2f} s")
+                except Exception as e:
+                    logger.warning(f"Préchargement de YouTube impossible: {e}")
+                    
+        self.warm_state = "ready"
+        return True
+        
+    def ensure_browser(self, headless=False):
+        """Garantit que le navigateur est lancé, en attendant la fin d'un préchauffage en cours"""
+        with self.browser_lock:
+            if not self.is_initialized:
+                self.warm_state = "starting"
+                self.warm_state = "ready" if self.initialize_browser(headless) else "failed"
+        return self.is_initialized
         
     def initialize_browser(self, headless=False):
         """Initialise le navigateur Chrome avec Selenium"""
+        # Selenium n'est chargé qu'au lancement du premier navigateur
+        try:
+            from selenium import webdriver
+            from selenium.webdriver.chrome.options import Options
+            from selenium.common.exceptions import WebDriverException
+        except ImportError as e:
+            logger.error(f"Selenium n'est pas installé: {e}")
+            return False
+        
         try:
             chrome_options = Options()
 
@@ -45,8 +250,14 @@ class YouTubeController:
             logger.error(f"Erreur lors de l'initialisation du navigateur: {e}")
             return False
             
-    def open_video(self, url):
-        """Ouvre une vidéo YouTube"""
+    def open_video(self, url, pause_after_load=True):
+        """Ouvre une vidéo YouTube
+
+        Si pause_after_load est faux, l'appelant applique lui-même l'état voulu (apply_state)
+        juste après le chargement, ce qui évite un aller-retour WebDriver.
+        Quand un lecteur est déjà ouvert, la vidéo est changée sur place (switch_video)
+        plutôt qu'en rechargeant toute la page.
+        """
         if not self.is_initialized:
             logger.error("Le navigateur n'est pas initialisé")
             return False
@@ -68,32 +279,28 @@ class YouTubeController:
                 
             # Construction de l'URL de partage propre
             clean_url = f"https://www.youtube.com/watch?v={self.video_id}"
-            self.driver.get(clean_url)
-            
-            # Attente que la vidéo soit chargée
-            WebDriverWait(self.driver, 10).until(
-                EC.presence_of_element_located((By.ID, "movie_player"))
-            )
+            start = time.perf_counter()
+            # Vidéo préparée sans lecture si l'appelant veut une pause, sinon chargée directement
+            in_place = self.switch_video(self.video_id, cue=pause_after_load)
+            if not in_place:
+                self.driver.get(clean_url)
+            navigated = time.perf_counter()
             
-            # Accepter le cookie consent si présent
-            try:
-                consent_button = WebDriverWait(self.driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[contains(@aria-label, 'Accepter') or contains(@aria-label, 'Accept')]"))
-                )
-                consent_button.click()
-            except:
-                pass  # Ignorer si le bouton de consentement n'est pas présent
+            # Attente que le lecteur soit réellement prêt (au plus load_timeout secondes)
+            ready = self.wait_until_ready(video_id=self.video_id)
+            self.record_load_timings(start, navigated, ready, "in_place" if in_place else "navigation")
             
-            # Petite pause pour laisser la vidéo se charger correctement
-            time.sleep(2)
+            # Les événements émis par l'ancienne vidéo et par le chargement ne sont pas des actions de l'utilisateur
+            with self.events_lock:
+                self.pending_events.clear()
             
             # IMPORTANT: Forcer la mise en pause immédiatement après le chargement
             # Cela évite que la vidéo ne démarre automatiquement chez le client
-            try:
-                self.pause()
-                logger.info("Vidéo mise en pause automatiquement après chargement")
-            except Exception as e:
-                logger.error(f"Erreur lors de la mise en pause initiale: {e}")
+            # (le même appel injecte l'agent qui suit l'état du lecteur)
+            # Une vidéo préparée sur place avec cueVideoById est déjà en pause
+            if pause_after_load and not in_place:
+                if self.execute_batch([("pauseVideo", [])]) is not None:
+                    logger.info("Vidéo mise en pause automatiquement après chargement")
                 
             logger.info(f"Vidéo YouTube ouverte avec succès: {clean_url}")
             return True
@@ -102,6 +309,51 @@ class YouTubeController:
             logger.error(f"Erreur lors de l'ouverture de la vidéo: {e}")
             return False
             
+    def switch_video(self, video_id, cue=False):
+        """Change de vidéo dans le lecteur déjà ouvert, renvoie False si une navigation est nécessaire"""
+        try:
+            return bool(self.driver.execute_script(SWITCH_SCRIPT, video_id, cue))
+        except Exception as e:
+            logger.debug(f"Changement de vidéo sur place impossible: {e}")
+            return False
+            
+    def wait_until_ready(self, timeout=None, video_id=None):
+        """Attend que le lecteur soit prêt à recevoir des commandes
+
+        Si video_id est donné, attend aussi que ce soit cette vidéo qui soit chargée.
+        Renvoie l'état relevé par READY_SCRIPT, ou None si le plafond est atteint
+        (la vidéo est alors utilisée telle quelle, comme avant).
+        """
+        from selenium.webdriver.support.ui import WebDriverWait
+        from selenium.common.exceptions import TimeoutException
+        
+        timeout = self.load_timeout if timeout is None else timeout
+        try:
+            return WebDriverWait(self.driver, timeout, poll_frequency=self.load_poll_interval).until(
+                lambda driver: driver.execute_script(READY_SCRIPT, video_id)
+            )
+        except TimeoutException:
+            logger.warning(f"Lecteur toujours pas prêt après {timeout} secondes, poursuite du chargement")
+            return None
+            
+    def record_load_timings(self, start, navigated, ready, mode="navigation"):
+        """Conserve et journalise les durées du dernier chargement de vidéo"""
+        end = time.perf_counter()
+        self.last_load_timings = {
+            "mode": mode,  # "navigation" (driver.get) ou "in_place" (changement dans le lecteur)
+            "navigation": navigated - start,  # Chargement de la page ou changement de vidéo
+            "player": end - navigated,  # Attente du lecteur après la navigation
+            "total": end - start,
+            "timed_out": ready is None,
+            "state": ready.get("state") if ready else None
+        }
+        logger.info(
+            f"Vidéo chargée ({'sur place' if mode == 'in_place' else 'navigation'}) "
+            f"en {self.last_load_timings['total']:.2f} s "
+            f"(page {self.last_load_timings['navigation']:.2f} s, lecteur {self.last_load_timings['player']:.2f} s"
+            f"{', plafond atteint' if ready is None else ''})"
+        )
+        
     def play(self):
         """Lance la lecture de la vidéo"""
         if not self.is_initialized:
@@ -134,13 +386,148 @@ class YouTubeController:
             return False
             
         try:
+            start = time.perf_counter()
             self.driver.execute_script(f"document.getElementById('movie_player').seekTo({time_seconds}, true);")
+            # Le seek s'exécute dès l'arrivée du script : seul le trajet aller compte
+            self.record_seek_latency((time.perf_counter() - start) / 2)
             logger.info(f"Lecture déplacée à {time_seconds} secondes")
             return True
         except Exception as e:
             logger.error(f"Erreur lors du déplacement de la lecture: {e}")
             return False
             
+    def install_agent(self):
+        """Injecte dans la page l'agent JavaScript qui suit l'état du lecteur (idempotent)"""
+        if not self.is_initialized:
+            return False
+            
+        try:
+            self.driver.execute_script(AGENT_SCRIPT)
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors de l'injection de l'agent: {e}")
+            return False
+            
+    def execute_batch(self, commands):
+        """Exécute plusieurs commandes du lecteur en un seul aller-retour WebDriver
+
+        commands est une liste de (méthode du lecteur, [arguments]), par exemple
+        [("seekTo", [42.0, True]), ("playVideo", [])] ; la pseudo-méthode "playbackRate"
+        règle la vitesse de l'élément <video>. L'agent est injecté au passage si besoin.
+        Renvoie l'état du lecteur après exécution (comme get_state) ou None en cas d'erreur.
+        """
+        if not self.is_initialized:
+            return None
+            
+        try:
+            snapshot = self.driver.execute_script(
+                AGENT_SCRIPT + BATCH_SCRIPT,
+                [[name, list(args)] for name, args in commands]
+            )
+            return self.parse_snapshot(snapshot)
+        except Exception as e:
+            logger.error(f"Erreur lors de l'exécution des commandes du lecteur: {e}")
+            return None
+            
+    def apply_state(self, time_seconds, playing, rate=1.0, seek_tolerance=0):
+        """Applique position, lecture/pause et vitesse en un seul appel au navigateur
+
+        Avec seek_tolerance, le seek n'a lieu que si le lecteur est à plus de
+        seek_tolerance secondes de la position voulue (évite une remise en mémoire tampon).
+        """
+        seek = ("seekNear", [time_seconds, seek_tolerance]) if seek_tolerance > 0 else ("seekTo", [time_seconds, True])
+        commands = [
+            seek,
+            ("playVideo" if playing else "pauseVideo", []),
+            ("playbackRate", [rate])
+        ]
+        
+        start = time.perf_counter()
+        snapshot = self.execute_batch(commands)
+        if snapshot is None:
+            return False
+            
+        # Délai avant que le seek ne s'exécute : trajet aller (moitié de l'aller-retour hors
+        # temps passé dans la page) plus les instructions du lot qui le précèdent.
+        # Sans seek (seekNear dans la tolérance), rien n'est mesuré.
+        if snapshot.get("seekAt") is not None:
+            round_trip = time.perf_counter() - start
+            page_time = (snapshot.get("batchTime") or 0) / 1000
+            self.record_seek_latency(max(0.0, round_trip - page_time) / 2 + snapshot["seekAt"] / 1000)
+        
+        logger.info(f"État appliqué: {time_seconds} secondes, {'lecture' if playing else 'pause'}, vitesse {rate}")
+        return True
+        
+    def get_state(self):
+        """Récupère l'état du lecteur en un seul appel WebDriver
+
+        Renvoie {"time", "state", "playing", "rate", "buffered"} ou None en cas d'erreur.
+        Les événements mis en tampon par l'agent sont conservés pour poll_events().
+        """
+        if not self.is_initialized:
+            return None
+            
+        try:
+            snapshot = self.driver.execute_script(STATE_SCRIPT)
+            if snapshot is None:
+                # Agent absent (nouvelle page) : l'injecter et relever l'état dans le même appel
+                snapshot = self.driver.execute_script(AGENT_SCRIPT + STATE_SCRIPT)
+                
+            return self.parse_snapshot(snapshot)
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération de l'état du lecteur: {e}")
+            return None
+            
+    def parse_snapshot(self, snapshot):
+        """Normalise l'état renvoyé par l'agent et met ses événements en tampon"""
+        if snapshot is None:
+            return None
+            
+        events = snapshot.pop("events", None) or []
+        if events:
+            with self.events_lock:
+                self.pending_events.extend(events)
+                del self.pending_events[:-self.max_pending_events]
+                
+        snapshot["time"] = float(snapshot.get("time") or 0)
+        snapshot["playing"] = snapshot.get("state") == 1  # État 1 = en lecture
+        return snapshot
+            
+    def poll_events(self):
+        """Renvoie et vide les événements du lecteur reçus depuis le dernier appel"""
+        with self.events_lock:
+            events = self.pending_events
+            self.pending_events = []
+        return events
+            
+    def set_playback_rate(self, rate):
+        """Modifie la vitesse de lecture (valeur libre, ex: 1.03)
+
+        setPlaybackRate() du lecteur YouTube arrondit aux vitesses de son menu (0.25, 0.5...),
+        on agit donc directement sur l'élément <video> de la page.
+        """
+        if not self.is_initialized:
+            return False
+            
+        try:
+            self.driver.execute_script(
+                "var v = document.querySelector('#movie_player video'); if (v) { v.playbackRate = arguments[0]; }",
+                rate
+            )
+            logger.info(f"Vitesse de lecture réglée à {rate:.3f}")
+            return True
+        except Exception as e:
+            logger.error(f"Erreur lors du réglage de la vitesse de lecture: {e}")
+            return False
+            
+    def record_seek_latency(self, elapsed):
+        """Intègre le délai d'exécution d'un seek (envoi -> seek dans la page) dans la moyenne lissée"""
+        if self.seek_samples == 0:
+            self.seek_latency = elapsed
+        else:
+            self.seek_latency += self.seek_latency_alpha * (elapsed - self.seek_latency)
+        self.seek_samples += 1
+            
     def get_current_time(self):
         """Récupère le temps actuel de la vidéo en secondes"""
         if not self.is_initialized:
@@ -166,12 +553,28 @@ class YouTubeController:
             logger.error(f"Erreur lors de la vérification de l'état de lecture: {e}")
             return False
             
-    def close(self):
-        """Ferme le navigateur"""
+    def close(self, wait=0):
+        """Ferme le navigateur (pendant un préchauffage, dès que le navigateur est lancé)
+
+        wait : durée maximale (secondes) d'attente de la fin d'un préchauffage en cours,
+        utile quand le processus va se terminer (le thread de préchauffage est un démon).
+        """
+        with self.close_lock:
+            if self.warming:
+                self.close_requested = True
+                thread = self.prewarm_thread
+            else:
+                thread = None
+        if thread is not None:
+            if wait:
+                thread.join(wait)
+            return
+                
         if self.is_initialized and self.driver:
             try:
                 self.driver.quit()
                 self.is_initialized = False
+                self.warm_state = "idle"
                 logger.info("Navigateur fermé avec succès")
             except Exception as e:
                 logger.error(f"Erreur lors de la fermeture du navigateur: {e}")
\ No newline at end of file